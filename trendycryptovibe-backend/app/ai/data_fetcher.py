@@ -1,9 +1,11 @@
 import requests
 import time
 import pandas as pd
+from app.core.metrics import observe
 
 BINANCE_KLINES = "https://api.binance.com/api/v3/klines"
 
+@observe("fetch_binance_klines")
 def fetch_binance_klines(symbol="BTCUSDT", interval="1d", limit=500):
     """
     Returns pandas Series of close prices and timestamps.
@@ -20,3 +22,16 @@ def fetch_binance_klines(symbol="BTCUSDT", interval="1d", limit=500):
     df["close"] = df["close"].astype(float)
     df["open_time"] = pd.to_datetime(df["open_time"], unit="ms")
     return df[["open_time","close"]]
+
+@observe("fetch_binance_minute_klines")
+def fetch_binance_minute_klines(symbol="BTCUSDT", start_time=None, limit=1000):
+    """
+    Raw 1m kline rows ([openTime, open, high, low, close, volume, ...]) from
+    start_time (ms) on; higher timeframes are derived by app.ai.resample.
+    """
+    params = {"symbol": symbol, "interval": "1m", "limit": limit}
+    if start_time is not None:
+        params["startTime"] = int(start_time)
+    r = requests.get(BINANCE_KLINES, params=params, timeout=30)
+    r.raise_for_status()
+    return r.json()
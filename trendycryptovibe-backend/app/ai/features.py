@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+import numpy as np
+from .kernels import compute_indicators
+
+FEATURE_NAMES = (
+    "ret_1", "ret_5", "ret_20", "ma_ratio", "close_ma_long", "rsi",
+    "macd", "macd_hist", "bb_position", "bb_width", "volatility_20",
+)
+# bars before the first row where every feature is defined
+WARMUP_BARS = 34
+FEATURE_CACHE_SIZE = 512
+
+
+def feature_matrix(closes, ma_short: int = 5, ma_long: int = 20) -> np.ndarray:
+    """
+    One row of scale-free features per bar, built from the add_indicators
+    columns (moving averages, RSI, MACD, Bollinger bands) plus returns.
+    Rows before WARMUP_BARS contain NaNs.
+    """
+    close = np.asarray(closes, dtype=np.float64)
+    n = len(close)
+    ind = compute_indicators(close, ma_short=ma_short, ma_long=ma_long)
+    log_close = np.log(close)
+
+    out = np.full((n, len(FEATURE_NAMES)), np.nan)
+    for col, lag in enumerate((1, 5, 20)):
+        if n > lag:
+            out[lag:, col] = log_close[lag:] - log_close[:-lag]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[:, 3] = ind[f"ma_{ma_short}"] / ind[f"ma_{ma_long}"] - 1
+        out[:, 4] = close / ind[f"ma_{ma_long}"] - 1
+        out[:, 5] = ind["rsi"] / 100 - 0.5
+        out[:, 6] = ind["macd"] / close
+        out[:, 7] = (ind["macd"] - ind["macd_signal"]) / close
+        band = ind["bb_h"] - ind["bb_l"]
+        out[:, 8] = np.where(band > 0, (close - ind["bb_l"]) / band - 0.5, 0.0)
+        out[:, 9] = band / close
+    if n > 20:
+        returns = np.diff(log_close)
+        window = np.lib.stride_tricks.sliding_window_view(returns, 20)
+        out[20:, 10] = window.std(axis=1)
+    return out
+
+
+class FeatureCache:
+    """
+    LRU of feature matrices keyed by (symbol, interval, last candle ts and
+    close): a new or updated candle changes the key, so entries never need
+    invalidating.
+    """
+
+    def __init__(self, max_entries: int = FEATURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, int, float], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[np.ndarray]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value: np.ndarray):
+        value.flags.writeable = False
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+feature_cache = FeatureCache()
+
+
+def symbol_features(symbol: str, interval: str, store=None, bars: int = 300) -> Optional[np.ndarray]:
+    """
+    Cached feature matrix over the latest `bars` candles of a symbol.
+    """
+    if store is None:
+        from app.ai.resample import candles as store
+
+    data = store.bars(symbol, interval, limit=bars)
+    if not len(data["ts"]):
+        return None
+    key = (symbol, interval, int(data["ts"][-1]), float(data["close"][-1]))
+    features = feature_cache.get(key)
+    if features is None:
+        features = feature_matrix(data["close"])
+        feature_cache.put(key, features)
+    return features
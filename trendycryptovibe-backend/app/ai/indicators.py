@@ -1,17 +1,28 @@
-import pandas as pd
 import numpy as np
-import ta  
+from app.core.metrics import observe
+from .kernels import compute_indicators, backfill
 
-def add_indicators(df, ma_short=5, ma_long=20, rsi_period=14):
-    df = df.copy()
-    df[f"ma_{ma_short}"] = df["close"].rolling(ma_short).mean()
-    df[f"ma_{ma_long}"] = df["close"].rolling(ma_long).mean()
-    df["rsi"] = ta.momentum.rsi(df["close"], window=rsi_period)
-    macd = ta.trend.MACD(df["close"])
-    df["macd"] = macd.macd()
-    df["macd_signal"] = macd.macd_signal()
-    boll = ta.volatility.BollingerBands(df["close"])
-    df["bb_h"] = boll.bollinger_hband()
-    df["bb_l"] = boll.bollinger_lband()
-    df = df.fillna(method="bfill").fillna(method="ffill")
+@observe("add_indicators")
+def add_indicators(df, ma_short=5, ma_long=20, rsi_period=14, dtype=np.float64):
+    """
+    Adds ma_<short>, ma_<long>, rsi, macd, macd_signal, bb_h and bb_l (plus
+    atr, stoch_k, stoch_d and williams_r when the frame has high/low) from
+    the fused kernels in app.ai.kernels. Warm-up rows are back-filled.
+    Pass dtype=np.float32 to halve memory on very long series.
+    """
+    close = df["close"]
+    if close.hasnans:
+        close = close.bfill().ffill()
+    close = close.to_numpy(dtype=dtype)
+    ohlc = "high" in df.columns and "low" in df.columns
+    values = compute_indicators(
+        close,
+        df["high"].to_numpy(dtype=dtype) if ohlc else None,
+        df["low"].to_numpy(dtype=dtype) if ohlc else None,
+        ma_short=ma_short, ma_long=ma_long, rsi_period=rsi_period, dtype=dtype,
+    )
+    # shallow copy: new columns never touch the caller's frame
+    df = df.copy(deep=False)
+    for name, column in values.items():
+        df[name] = backfill(column)
     return df
@@ -0,0 +1,240 @@
+import math
+from typing import Dict, Optional
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# rows per pass; temporaries are O(CHUNK) whatever the series length
+CHUNK = 1 << 16
+# EMA block length; bounded further so w**-BLOCK stays finite in the dtype
+BLOCK = 128
+
+
+def _recur(u: np.ndarray, w: float, init: float) -> np.ndarray:
+    """
+    y[i] = u[i] + w * y[i-1] with y[-1] = init, without a Python loop:
+    inside a block of B rows y[k] = w**k * cumsum(u[j] * w**-j) + w**(k+1) * y[-1],
+    and the block-end values obey the same recurrence with w**B, solved
+    recursively.
+    """
+    dtype = u.dtype
+    m = len(u)
+    if m == 0:
+        return u
+    info = np.finfo(dtype)
+    if w < info.tiny:
+        return u.copy()
+
+    size = int(min(BLOCK, max(2, 0.5 * math.log(info.max) // -math.log(w))))
+    blocks = -(-m // size)
+    padded = np.zeros(blocks * size, dtype=dtype)
+    padded[:m] = u
+    rows = padded.reshape(blocks, size)
+
+    steps = np.arange(size, dtype=dtype)
+    w_pow = np.power(dtype.type(w), steps)
+    rows *= 1 / w_pow
+    np.cumsum(rows, axis=1, out=rows)
+    rows *= w_pow
+
+    if blocks == 1:
+        carry_in = np.array([init], dtype=dtype)
+    else:
+        ends = rows[:, -1].copy()
+        # once w**B is below the dtype's precision a block no longer feels the one before last
+        if w ** size >= info.eps:
+            ends = _recur(ends, w ** size, init)
+        else:
+            ends[0] += w ** size * init
+        carry_in = np.concatenate((np.array([init], dtype=dtype), ends[:-1]))
+    rows += (w_pow * dtype.type(w))[None, :] * carry_in[:, None]
+    return padded[:m]
+
+
+def _ema_alpha(span: int) -> float:
+    return 2.0 / (span + 1)
+
+
+def allocate(n: int, names, dtype=np.float64) -> Dict[str, np.ndarray]:
+    """
+    Preallocated outputs for compute_indicators; reuse them across calls of
+    the same length to avoid reallocating on every scan.
+    """
+    return {name: np.empty(n, dtype=dtype) for name in names}
+
+
+def output_names(ma_short: int = 5, ma_long: int = 20, ohlc: bool = False):
+    names = [f"ma_{ma_short}", f"ma_{ma_long}", "rsi", "macd", "macd_signal", "bb_h", "bb_l"]
+    if ohlc:
+        names += ["atr", "stoch_k", "stoch_d", "williams_r"]
+    return list(dict.fromkeys(names))
+
+
+def compute_indicators(close, high=None, low=None, ma_short: int = 5, ma_long: int = 20, rsi_period: int = 14,
+                       macd_fast: int = 12, macd_slow: int = 26, macd_sign: int = 9,
+                       bb_window: int = 20, bb_dev: float = 2.0, atr_period: int = 14,
+                       stoch_window: int = 14, stoch_smooth: int = 3,
+                       dtype=np.float64, out: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """
+    All indicators in one chunked pass over the series, with the same
+    definitions (and NaN warm-up) as the `ta` package:
+      ma_<n>         simple moving averages
+      rsi            Wilder RSI (EMA alpha 1/period)
+      macd, macd_signal   EMA(fast) - EMA(slow), EMA(sign) of that
+      bb_h, bb_l     Bollinger bands (population std)
+    and, when high/low are given, atr (Wilder), stoch_k/stoch_d and
+    williams_r. One cumulative sum of the centred closes (and their
+    squares) serves every moving average and the bands; the two MACD EMAs
+    are computed once and differenced in place. dtype=np.float32 halves the
+    memory; moving sums are still accumulated in float64.
+    """
+    dtype = np.dtype(dtype)
+    c = np.asarray(close, dtype=dtype)
+    n = len(c)
+    ohlc = high is not None and low is not None
+    if ohlc:
+        hi = np.asarray(high, dtype=dtype)
+        lw = np.asarray(low, dtype=dtype)
+    names = output_names(ma_short, ma_long, ohlc)
+    if out is None:
+        out = allocate(n, names, dtype)
+    for name in names:
+        if out[name].shape != (n,):
+            raise ValueError(f"Output '{name}' must have shape ({n},)")
+    if n == 0:
+        return out
+
+    # warm-up rows are NaN, exactly where ta's min_periods leaves them NaN
+    macd_start = max(macd_fast, macd_slow) - 1
+    sign_start = macd_start + macd_sign - 1
+    warmup = {f"ma_{ma_short}": ma_short - 1, f"ma_{ma_long}": ma_long - 1, "rsi": rsi_period - 1,
+              "macd": macd_start, "macd_signal": sign_start, "bb_h": bb_window - 1, "bb_l": bb_window - 1}
+    if ohlc:
+        warmup.update({"atr": atr_period - 1, "stoch_k": stoch_window - 1,
+                       "stoch_d": stoch_window + stoch_smooth - 2, "williams_r": stoch_window - 1})
+    for name, rows in warmup.items():
+        out[name][:min(n, rows)] = np.nan
+
+    sma_windows = sorted({ma_short, ma_long, bb_window})
+    lookback = max(sma_windows)
+    ref = float(c[0])
+
+    a_fast, a_slow, a_sign = _ema_alpha(macd_fast), _ema_alpha(macd_slow), _ema_alpha(macd_sign)
+    a_rsi = 1.0 / rsi_period
+    # EMA state is the previous output; pandas (adjust=False) seeds y[0] = x[0]
+    fast_prev = slow_prev = 0.0
+    up_prev = down_prev = 0.0
+    sign_prev = None
+
+    if ohlc:
+        a_atr = 1.0 / atr_period
+        atr_prev = None
+        if n >= atr_period:
+            head_tr = hi[:atr_period] - lw[:atr_period]
+            head_tr[1:] = _true_range(hi[1:atr_period], lw[1:atr_period], c[:atr_period - 1])
+            atr_prev = float(head_tr.mean(dtype=np.float64))
+            out["atr"][atr_period - 1] = atr_prev
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for s in range(0, n, CHUNK):
+            e = min(n, s + CHUNK)
+            x = c[s:e]
+
+            # moving sums from one shared cumulative sum of the centred closes
+            lo = max(0, s - lookback)
+            seg = c[lo:e].astype(np.float64) - ref
+            cs = np.zeros(len(seg) + 1)
+            np.cumsum(seg, out=cs[1:])
+            cs2 = np.zeros(len(seg) + 1)
+            np.cumsum(seg * seg, out=cs2[1:])
+            for window in sma_windows:
+                first = max(s, window - 1)
+                if first >= e:
+                    continue
+                end, start = slice(first - lo + 1, e - lo + 1), slice(first - lo + 1 - window, e - lo + 1 - window)
+                mean = (cs[end] - cs[start]) / window
+                if window in (ma_short, ma_long):
+                    out[f"ma_{window}"][first:e] = mean + ref
+                if window == bb_window:
+                    var = np.maximum((cs2[end] - cs2[start]) / window - mean * mean, 0.0)
+                    band = bb_dev * np.sqrt(var)
+                    out["bb_h"][first:e] = mean + ref + band
+                    out["bb_l"][first:e] = mean + ref - band
+
+            # Wilder RSI: EMA(1/period) of gains and losses
+            diff = np.empty(e - s, dtype=dtype)
+            diff[1:] = np.diff(x)
+            diff[0] = x[0] - c[s - 1] if s else 0
+            up = _recur(np.maximum(diff, 0) * dtype.type(a_rsi), 1 - a_rsi, up_prev)
+            down = _recur(np.maximum(-diff, 0) * dtype.type(a_rsi), 1 - a_rsi, down_prev)
+            up_prev, down_prev = float(up[-1]), float(down[-1])
+            rsi = np.where(down == 0, dtype.type(100), 100 * up / (up + down))
+            first = max(s, rsi_period - 1)
+            out["rsi"][first:e] = rsi[first - s:]
+
+            # MACD: the fast EMA lands in the output and the slow one is subtracted in place;
+            # both run on centred closes (EMA is linear) to keep float32 precision
+            centred = x - dtype.type(ref)
+            macd = out["macd"][s:e]
+            macd[:] = _recur(centred * dtype.type(a_fast), 1 - a_fast, fast_prev)
+            fast_prev = float(macd[-1])
+            slow = _recur(centred * dtype.type(a_slow), 1 - a_slow, slow_prev)
+            slow_prev = float(slow[-1])
+            macd -= slow
+            if s < macd_start:
+                macd[:min(e, macd_start) - s] = np.nan
+
+            first = max(s, macd_start)
+            if first < e:
+                source = out["macd"][first:e]
+                if sign_prev is None:
+                    sign_prev = float(source[0])
+                signal = _recur(source * dtype.type(a_sign), 1 - a_sign, sign_prev)
+                sign_prev = float(signal[-1])
+                keep = max(first, sign_start)
+                out["macd_signal"][keep:e] = signal[keep - first:]
+
+            if not ohlc:
+                continue
+
+            first = max(s, atr_period)
+            if atr_prev is not None and first < e:
+                tr = _true_range(hi[first:e], lw[first:e], c[first - 1:e - 1])
+                atr = _recur(tr * dtype.type(a_atr), 1 - a_atr, atr_prev)
+                atr_prev = float(atr[-1])
+                out["atr"][first:e] = atr
+
+            first = max(s, stoch_window - 1)
+            if first < e:
+                start = first - stoch_window + 1
+                highest = sliding_window_view(hi[start:e], stoch_window).max(axis=1)
+                lowest = sliding_window_view(lw[start:e], stoch_window).min(axis=1)
+                span = highest - lowest
+                out["stoch_k"][first:e] = 100 * (c[first:e] - lowest) / span
+                out["williams_r"][first:e] = -100 * (highest - c[first:e]) / span
+
+            first = max(s, stoch_window + stoch_smooth - 2)
+            if first < e:
+                k = out["stoch_k"][first - stoch_smooth + 1:e]
+                out["stoch_d"][first:e] = sliding_window_view(k, stoch_smooth).sum(axis=1, dtype=np.float64) / stoch_smooth
+
+    return out
+
+
+def _true_range(high, low, prev_close):
+    tr = high - low
+    np.maximum(tr, np.abs(high - prev_close), out=tr)
+    np.maximum(tr, np.abs(low - prev_close), out=tr)
+    return tr
+
+
+def backfill(values: np.ndarray) -> np.ndarray:
+    # warm-up NaNs are all leading, so a bfill is one slice assignment
+    head = 64
+    while True:
+        valid = np.flatnonzero(~np.isnan(values[:head]))
+        if len(valid) or head >= len(values):
+            break
+        head *= 8
+    if len(valid) and valid[0] > 0:
+        values[:valid[0]] = values[valid[0]]
+    return values
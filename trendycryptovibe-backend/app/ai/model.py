@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .features import FEATURE_NAMES, WARMUP_BARS, feature_matrix
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+# pin a version (e.g. "3"); by default the newest artifact is served
+MODEL_VERSION = os.getenv("PREDICTOR_MODEL_VERSION")
+CLASSES = ("sell", "hold", "buy")
+_ARTIFACT = re.compile(r"^predictor-v(\d+)\.npz$")
+
+
+class SoftmaxRegression:
+    """
+    Multinomial logistic regression in NumPy: standardized inputs, L2
+    penalty, full-batch gradient descent. Small enough to train on a laptop
+    and to score thousands of rows with one matrix product.
+    """
+
+    def __init__(self, l2: float = 1e-3, learning_rate: float = 0.5, epochs: int = 500):
+        self.l2 = l2
+        self.learning_rate = learning_rate
+        self.epochs = epochs
+        self.mean = self.std = self.weights = self.bias = None
+
+    @staticmethod
+    def _softmax(z: np.ndarray) -> np.ndarray:
+        z = z - z.max(axis=1, keepdims=True)
+        np.exp(z, out=z)
+        z /= z.sum(axis=1, keepdims=True)
+        return z
+
+    def fit(self, x: np.ndarray, y: np.ndarray) -> "SoftmaxRegression":
+        self.mean = x.mean(axis=0)
+        self.std = x.std(axis=0)
+        self.std[self.std == 0] = 1.0
+        xs = (x - self.mean) / self.std
+        n, k = xs.shape
+        onehot = np.zeros((n, len(CLASSES)))
+        onehot[np.arange(n), y] = 1.0
+        # inverse-frequency weights so "hold" does not swamp the rare moves
+        counts = np.maximum(onehot.sum(axis=0), 1.0)
+        sample_weight = (n / (len(CLASSES) * counts))[y][:, None]
+
+        self.weights = np.zeros((k, len(CLASSES)))
+        self.bias = np.zeros(len(CLASSES))
+        for _ in range(self.epochs):
+            grad = (self._softmax(xs @ self.weights + self.bias) - onehot) * sample_weight / n
+            self.weights -= self.learning_rate * (xs.T @ grad + self.l2 * self.weights)
+            self.bias -= self.learning_rate * grad.sum(axis=0)
+        return self
+
+    def predict_proba(self, x: np.ndarray) -> np.ndarray:
+        return self._softmax((x - self.mean) / self.std @ self.weights + self.bias)
+
+
+def make_labels(closes: np.ndarray, horizon: int, threshold: float) -> np.ndarray:
+    """
+    0 = sell, 1 = hold, 2 = buy, from the return over the next `horizon`
+    bars; the last `horizon` bars have no label (-1).
+    """
+    labels = np.full(len(closes), -1, dtype=np.int64)
+    if len(closes) > horizon:
+        forward = closes[horizon:] / closes[:-horizon] - 1
+        labels[:-horizon] = np.where(forward > threshold, 2, np.where(forward < -threshold, 0, 1))
+    return labels
+
+
+def training_set(series: List[np.ndarray], horizon: int, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    xs, ys = [], []
+    for closes in series:
+        closes = np.asarray(closes, dtype=np.float64)
+        x = feature_matrix(closes)
+        y = make_labels(closes, horizon, threshold)
+        keep = (y >= 0) & ~np.isnan(x).any(axis=1)
+        keep[:WARMUP_BARS] = False
+        xs.append(x[keep])
+        ys.append(y[keep])
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+class PredictorModel:
+    """
+    A trained model plus the metadata it was trained with.
+    """
+
+    def __init__(self, regression: SoftmaxRegression, meta: dict):
+        self.regression = regression
+        self.meta = meta
+
+    @property
+    def version(self) -> int:
+        return self.meta["version"]
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        return self.regression.predict_proba(features)
+
+    def save(self, directory: str = MODEL_DIR) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"predictor-v{self.version}.npz")
+        r = self.regression
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, mean=r.mean, std=r.std, weights=r.weights, bias=r.bias,
+                 meta=np.array(json.dumps(self.meta)))
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "PredictorModel":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if tuple(meta["features"]) != FEATURE_NAMES:
+                raise ValueError(f"{path} was trained on different features")
+            regression = SoftmaxRegression()
+            regression.mean, regression.std = data["mean"], data["std"]
+            regression.weights, regression.bias = data["weights"], data["bias"]
+        return cls(regression, meta)
+
+
+def available_versions(directory: str = MODEL_DIR) -> List[int]:
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(int(m.group(1)) for m in map(_ARTIFACT.match, names) if m)
+
+
+def train(series: Dict[str, np.ndarray], interval: str, horizon: int = 4, threshold: float = 0.005,
+          validation: float = 0.2, directory: str = MODEL_DIR, **params) -> PredictorModel:
+    """
+    Fit on the first (1 - validation) of every series, score on the rest
+    (time-ordered, no shuffling), and save the next artifact version.
+    """
+    train_parts, valid_parts = [], []
+    for closes in series.values():
+        closes = np.asarray(closes, dtype=np.float64)
+        cut = int(len(closes) * (1 - validation))
+        train_parts.append(closes[:cut])
+        valid_parts.append(closes[max(0, cut - WARMUP_BARS):])
+    x, y = training_set(train_parts, horizon, threshold)
+    if len(y) == 0:
+        raise ValueError("Not enough candles to train on")
+    regression = SoftmaxRegression(**params).fit(x, y)
+
+    def accuracy(xv, yv):
+        return float((regression.predict_proba(xv).argmax(axis=1) == yv).mean()) if len(yv) else None
+
+    xv, yv = training_set(valid_parts, horizon, threshold) if validation else (x[:0], y[:0])
+    versions = available_versions(directory)
+    meta = {
+        "version": (versions[-1] + 1) if versions else 1,
+        "trained_at": datetime.utcnow().isoformat(),
+        "symbols": sorted(series),
+        "interval": interval,
+        "horizon": horizon,
+        "threshold": threshold,
+        "features": list(FEATURE_NAMES),
+        "classes": list(CLASSES),
+        "samples": int(len(y)),
+        "train_accuracy": accuracy(x, y),
+        "validation_accuracy": accuracy(xv, yv),
+        "class_counts": np.bincount(y, minlength=len(CLASSES)).tolist(),
+    }
+    model = PredictorModel(regression, meta)
+    model.save(directory)
+    return model
+
+
+_model: Optional[PredictorModel] = None
+_model_lock = threading.Lock()
+_model_checked = False
+
+
+def get_model(directory: str = MODEL_DIR) -> Optional[PredictorModel]:
+    """
+    The serving model, loaded once per worker and kept warm. None when no
+    artifact has been trained yet, or when the pinned one cannot be loaded
+    (logged once; callers fall back to the momentum rule).
+    """
+    global _model, _model_checked
+    if _model_checked:
+        return _model
+    with _model_lock:
+        if not _model_checked:
+            try:
+                versions = available_versions(directory)
+                version = int(MODEL_VERSION) if MODEL_VERSION else (versions[-1] if versions else None)
+                if version is not None:
+                    path = os.path.join(directory, f"predictor-v{version}.npz")
+                    _model = PredictorModel.load(path)
+                    logger.info("loaded predictor model v%s from %s", version, path)
+            except Exception:
+                logger.exception("could not load predictor model (PREDICTOR_MODEL_VERSION=%s) from %s",
+                                 MODEL_VERSION, directory)
+            _model_checked = True
+    return _model
+
+
+def reset_model():
+    # next get_model() reloads from disk, e.g. after training a new version
+    global _model, _model_checked
+    with _model_lock:
+        _model, _model_checked = None, False
+
+
+if __name__ == "__main__":
+    # usage: python -m app.ai.model BTCUSDT,ETHUSDT [interval] [horizon]
+    from app.ai.resample import candles
+
+    logging.basicConfig(level=logging.INFO)
+    symbols = sys.argv[1].split(",") if len(sys.argv) > 1 else ["BTCUSDT"]
+    interval = sys.argv[2] if len(sys.argv) > 2 else "1h"
+    horizon = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    closes = {}
+    for symbol in symbols:
+        candles.refresh(symbol, max_pages=int(os.getenv("TRAIN_PAGES", "50")))
+        closes[symbol] = candles.bars(symbol, interval)["close"]
+    model = train(closes, interval, horizon)
+    print(json.dumps(model.meta, indent=2))
@@ -25,4 +25,84 @@ def prediction(prices: list):
         return "buy"
     elif avg_change < -2:
         return "sell"
-    else: return "hold"
\ No newline at end of file
+    else: return "hold"
+
+def _label(model, probabilities):
+    classes = model.meta["classes"]
+    best = probabilities.argmax(axis=1)
+    return [
+        {"signal": classes[b], "probabilities": dict(zip(classes, map(float, p)))}
+        for b, p in zip(best, probabilities)
+    ]
+
+
+def predict_series(series: list) -> list:
+    """
+    Batched model inference: the last feature row of every price list goes
+    through one predict_proba call. Falls back to prediction() per series
+    when no model is trained or a series is shorter than the feature warm-up.
+    """
+    import numpy as np
+    from .features import WARMUP_BARS, feature_matrix
+    from .model import get_model
+
+    model = get_model()
+    results = [None] * len(series)
+    rows, index = [], []
+    for i, prices in enumerate(series):
+        if model is not None and len(prices) > WARMUP_BARS:
+            row = feature_matrix(prices)[-1]
+            if not np.isnan(row).any():
+                rows.append(row)
+                index.append(i)
+                continue
+        results[i] = {"signal": prediction(prices), "model_version": None}
+
+    if rows:
+        for i, out in zip(index, _label(model, model.predict_proba(np.vstack(rows)))):
+            results[i] = {**out, "model_version": model.version}
+    return results
+
+
+def predict_symbols(symbols: list, interval: str = "1h", store=None) -> dict:
+    """
+    Batched inference over stored candles. Feature matrices come from the
+    per-(symbol, interval, last candle) cache, so repeated calls between
+    candle closes only pay for the one matrix product. Raises ValueError for
+    a symbol outside the scan universe, an unknown interval, or one the
+    deployed model was not trained on.
+    """
+    import numpy as np
+    from .features import symbol_features
+    from .model import get_model
+    from .resample import interval_ms
+    from app.services.scanner import scanner
+
+    unknown = [s for s in symbols if s not in scanner.universe]
+    if unknown:
+        raise ValueError(f"Symbols outside the scanned universe: {', '.join(unknown[:10])}")
+    interval_ms(interval)
+    model = get_model()
+    if model is not None and interval != model.meta["interval"]:
+        raise ValueError(f"Model v{model.version} predicts {model.meta['interval']} candles, not {interval}")
+    if store is None:
+        from .resample import candles as store
+        # never fetch inside the request: a fresh worker answers "not enough data" until the scanner has them
+        scanner.prefetch(symbols)
+
+    results = dict.fromkeys(symbols)
+    rows, names = [], []
+    for symbol in symbols:
+        features = symbol_features(symbol, interval, store)
+        if features is None:
+            results[symbol] = {"signal": "not enough data", "model_version": None}
+        elif model is None or np.isnan(features[-1]).any():
+            results[symbol] = {"signal": prediction(store.closes(symbol, interval, limit=3)), "model_version": None}
+        else:
+            rows.append(features[-1])
+            names.append(symbol)
+
+    if rows:
+        for symbol, out in zip(names, _label(model, model.predict_proba(np.vstack(rows)))):
+            results[symbol] = {**out, "model_version": model.version}
+    return results
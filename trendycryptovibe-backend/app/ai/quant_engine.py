@@ -1,9 +1,12 @@
 import pandas as pd
 import numpy as np
 import math
+import time
 from typing import Dict, Any, List
 from .indicators import add_indicators
+from app.core.metrics import observe, ANALYTICS_LATENCY
 
+@observe("compute_metrics")
 def compute_metrics(equity_curve: List[float], initial_capital: float, trade_pnls: List[float], periods_per_year=252):
     # equity_curve is list of portfolio values per step
     returns = pd.Series(equity_curve).pct_change().fillna(0)
@@ -48,6 +51,7 @@ class QuantEngine:
             return "SELL"
         return "HOLD"
 
+    @observe("QuantEngine.backtest_df")
     def backtest_df(self, df: pd.DataFrame, initial_capital=1000.0, stop_loss=None, take_profit=None, fixed_size=None):
         """
         df: must contain 'close' and will have indicators added
@@ -55,6 +59,7 @@ class QuantEngine:
         fixed_size: if provided, buy this fraction of capital each buy (0-1)
         """
         df = add_indicators(df, ma_short=self.ma_short, ma_long=self.ma_long, rsi_period=self.rsi_period).reset_index(drop=True)
+        loop_start = time.perf_counter()
         cash = initial_capital
         position = 0.0
         position_entry_price = None
@@ -111,6 +116,7 @@ class QuantEngine:
 
             equity = cash + position * price
             equity_curve.append(equity)
+        ANALYTICS_LATENCY.observe(time.perf_counter() - loop_start, "QuantEngine.backtest_df.loop")
 
         final_val = cash + position * df.iloc[-1]["close"]
         metrics = compute_metrics(equity_curve, initial_capital, trade_pnls)
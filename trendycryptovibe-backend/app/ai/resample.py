@@ -0,0 +1,279 @@
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.metrics import observe
+
+MINUTE_MS = 60_000
+_UNIT_MS = {"m": MINUTE_MS, "h": 60 * MINUTE_MS, "d": 1440 * MINUTE_MS, "w": 7 * 1440 * MINUTE_MS}
+# epoch (1970-01-01) is a Thursday; exchanges start weekly bars on Monday
+_WEEK_OFFSET_MS = 4 * 1440 * MINUTE_MS
+_INTERVAL = re.compile(r"^(\d+)([mhdw])$")
+
+# minute candles kept per symbol (~48 bytes each); the oldest tenth is dropped past this
+RETENTION_MINUTES = int(os.getenv("CANDLE_RETENTION_MINUTES", str(180 * 1440)))
+
+COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def interval_ms(interval: str) -> Tuple[int, int]:
+    """
+    "5m" / "4h" / "1d" / "1w" -> (bucket length, bucket offset) in ms.
+    Buckets are aligned to UTC: 4h bars start at 00:00, 04:00, ...
+    """
+    match = _INTERVAL.match(interval)
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Unsupported interval: {interval}")
+    step = int(match.group(1)) * _UNIT_MS[match.group(2)]
+    return step, _WEEK_OFFSET_MS if match.group(2) == "w" else 0
+
+
+def _empty() -> Dict[str, np.ndarray]:
+    bars = {"ts": np.empty(0, dtype=np.int64), "minutes": np.empty(0, dtype=np.int64)}
+    bars.update({name: np.empty(0) for name in COLUMNS})
+    return bars
+
+
+def resample(ts: np.ndarray, ohlcv: np.ndarray, interval: str) -> Dict[str, np.ndarray]:
+    """
+    Aggregate sorted minute candles (ts in ms, ohlcv of shape (n, 5)) into
+    `interval` bars with segment reductions: first open, max high, min low,
+    last close, summed volume. Buckets with no minutes are left out rather
+    than invented; `minutes` counts the candles behind each bar, so a short
+    count marks a gap or the current partial bar.
+    """
+    if len(ts) == 0:
+        return _empty()
+    step, offset = interval_ms(interval)
+    bucket = (ts - offset) // step
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    ends = np.append(starts[1:], len(ts))
+    return {
+        "ts": bucket[starts] * step + offset,
+        "open": ohlcv[starts, 0],
+        "high": np.maximum.reduceat(ohlcv[:, 1], starts),
+        "low": np.minimum.reduceat(ohlcv[:, 2], starts),
+        "close": ohlcv[ends - 1, 3],
+        "volume": np.add.reduceat(ohlcv[:, 4], starts),
+        "minutes": ends - starts,
+    }
+
+
+def fill_gaps(bars: Dict[str, np.ndarray], interval: str) -> Dict[str, np.ndarray]:
+    """
+    Insert a flat bar (previous close, zero volume) for every empty bucket,
+    for strategies that assume one bar per period.
+    """
+    if len(bars["ts"]) < 2:
+        return bars
+    step, _ = interval_ms(interval)
+    slot = (bars["ts"] - bars["ts"][0]) // step
+    size = int(slot[-1]) + 1
+    if size == len(slot):
+        return bars
+
+    # index of the last real bar at or before each slot
+    source = np.zeros(size, dtype=np.int64)
+    source[slot] = np.arange(len(slot))
+    source = np.maximum.accumulate(source)
+    real = np.zeros(size, dtype=bool)
+    real[slot] = True
+
+    close = bars["close"][source]
+    filled = {
+        "ts": bars["ts"][0] + np.arange(size, dtype=np.int64) * step,
+        "close": close,
+        "volume": np.where(real, bars["volume"][source], 0.0),
+        "minutes": np.where(real, bars["minutes"][source], 0),
+    }
+    for name in ("open", "high", "low"):
+        filled[name] = np.where(real, bars[name][source], close)
+    return filled
+
+
+def _frozen(bars: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    # cached arrays are shared with every reader
+    for values in bars.values():
+        values.flags.writeable = False
+    return bars
+
+
+class _MinuteSeries:
+    """
+    Growable sorted arrays of one symbol's minute candles.
+    """
+
+    def __init__(self):
+        self.ts = np.empty(0, dtype=np.int64)
+        self.ohlcv = np.empty((0, 5))
+        self.n = 0
+
+    def view(self, start: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        return self.ts[start:self.n], self.ohlcv[start:self.n]
+
+    def merge(self, ts: np.ndarray, ohlcv: np.ndarray) -> int:
+        """
+        Upsert candles (new values win on equal timestamps) and return the
+        index of the first row that changed.
+        """
+        first = int(np.searchsorted(self.ts[:self.n], ts[0]))
+        if first < self.n:
+            # overlap with the stored tail: the exchange re-sent or corrected bars
+            old_ts, old = self.view(first)
+            ts = np.concatenate((old_ts, ts))
+            ohlcv = np.concatenate((old, ohlcv))
+            order = np.argsort(ts, kind="stable")
+            ts, ohlcv = ts[order], ohlcv[order]
+        keep = np.append(ts[1:] != ts[:-1], True)
+        ts, ohlcv = ts[keep], ohlcv[keep]
+
+        needed = first + len(ts)
+        if needed > len(self.ts):
+            capacity = max(needed, 2 * len(self.ts), 1024)
+            self.ts = np.resize(self.ts, capacity)
+            grown = np.empty((capacity, 5))
+            grown[:self.n] = self.ohlcv[:self.n]
+            self.ohlcv = grown
+        self.ts[first:needed] = ts
+        self.ohlcv[first:needed] = ohlcv
+        self.n = needed
+        return first
+
+    def trim(self, keep: int):
+        drop = self.n - keep
+        self.ts[:keep] = self.ts[drop:self.n]
+        self.ohlcv[:keep] = self.ohlcv[drop:self.n]
+        self.n = keep
+
+
+class CandleStore:
+    """
+    Minute candles per symbol plus a cache of every timeframe derived from
+    them, keyed by (symbol, interval). New minutes only recompute the cached
+    bars from the first affected bucket on, which for live data is just the
+    current partial bar.
+    """
+
+    def __init__(self, retention: int = RETENTION_MINUTES):
+        self.retention = retention
+        self._series: Dict[str, _MinuteSeries] = {}
+        self._cache: Dict[Tuple[str, str], Dict[str, np.ndarray]] = {}
+        self._lock = threading.RLock()
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted(self._series)
+
+    def last_ts(self, symbol: str) -> Optional[int]:
+        with self._lock:
+            series = self._series.get(symbol)
+            return int(series.ts[series.n - 1]) if series and series.n else None
+
+    def append(self, symbol: str, rows) -> int:
+        """
+        Add minute candles given as exchange kline rows
+        ([open_time_ms, open, high, low, close, volume, ...]); returns how
+        many rows were received.
+        """
+        data = np.asarray([row[:6] for row in rows], dtype=np.float64)
+        if len(data) == 0:
+            return 0
+        ts = data[:, 0].astype(np.int64)
+        ts -= ts % MINUTE_MS
+        ohlcv = data[:, 1:6]
+        if np.any(ts[1:] < ts[:-1]):
+            order = np.argsort(ts, kind="stable")
+            ts, ohlcv = ts[order], ohlcv[order]
+
+        with self._lock:
+            series = self._series.setdefault(symbol, _MinuteSeries())
+            first = series.merge(ts, ohlcv)
+            if series.n > self.retention:
+                series.trim(self.retention * 9 // 10)
+                self._drop_cache(symbol)
+            else:
+                self._update_cache(symbol, int(series.ts[first]))
+        return len(data)
+
+    def _drop_cache(self, symbol: str):
+        for key in [key for key in self._cache if key[0] == symbol]:
+            del self._cache[key]
+
+    def _update_cache(self, symbol: str, changed_ts: int):
+        series = self._series[symbol]
+        for (cached_symbol, interval), bars in list(self._cache.items()):
+            if cached_symbol != symbol:
+                continue
+            step, offset = interval_ms(interval)
+            bucket_start = (changed_ts - offset) // step * step + offset
+            keep = int(np.searchsorted(bars["ts"], bucket_start))
+            tail = resample(*series.view(int(np.searchsorted(series.ts[:series.n], bucket_start))), interval)
+            self._cache[(symbol, interval)] = _frozen({
+                name: np.concatenate((bars[name][:keep], tail[name])) for name in bars
+            })
+
+    @observe("CandleStore.bars")
+    def bars(self, symbol: str, interval: str, limit: Optional[int] = None, gaps: bool = False) -> Dict[str, np.ndarray]:
+        """
+        OHLCV arrays for any timeframe, newest last. The last bar may be
+        partial (its `minutes` is below the interval length).
+        """
+        key = (symbol, interval)
+        with self._lock:
+            bars = self._cache.get(key)
+            if bars is None:
+                series = self._series.get(symbol)
+                bars = _frozen(resample(*series.view(), interval)) if series else _empty()
+                if series:
+                    self._cache[key] = bars
+        if gaps:
+            bars = fill_gaps(bars, interval)
+        if limit:
+            bars = {name: values[-limit:] for name, values in bars.items()}
+        return bars
+
+    def frame(self, symbol: str, interval: str, limit: Optional[int] = None, gaps: bool = False):
+        """
+        Same shape as data_fetcher.fetch_ohlcv: UTC `ts` index with
+        open/high/low/close/volume columns.
+        """
+        import pandas as pd
+
+        bars = self.bars(symbol, interval, limit, gaps)
+        df = pd.DataFrame({name: bars[name] for name in COLUMNS})
+        df.index = pd.to_datetime(bars["ts"], unit="ms", utc=True).rename("ts")
+        return df
+
+    def closes(self, symbol: str, interval: str, limit: Optional[int] = None) -> List[float]:
+        return self.bars(symbol, interval, limit)["close"].tolist()
+
+    def refresh(self, symbol: str, fetch: Optional[Callable] = None, max_pages: int = 10) -> int:
+        """
+        Pull minute candles newer than the last stored one (the stored last
+        minute is re-fetched, since it may have been partial). This is the
+        only network call; every timeframe is then derived locally.
+        """
+        if fetch is None:
+            from app.ai.data_fetcher import fetch_binance_minute_klines as fetch
+
+        total = 0
+        for _ in range(max_pages):
+            rows = fetch(symbol, start_time=self.last_ts(symbol))
+            total += self.append(symbol, rows)
+            if len(rows) < 1000 or self.last_ts(symbol) is None:
+                break
+        return total
+
+
+candles = CandleStore()
+
+
+def get_ohlcv(symbol: str = "BTCUSDT", interval: str = "1h", limit: Optional[int] = None, gaps: bool = False):
+    """
+    DataFrame of `interval` bars for `symbol`; minute data is fetched only
+    the first time the symbol is seen.
+    """
+    if candles.last_ts(symbol) is None:
+        candles.refresh(symbol)
+    return candles.frame(symbol, interval, limit, gaps)
@@ -1,6 +1,7 @@
 # app/ai/trading_bot.py
 from typing import List, Dict, Any, Tuple
 from statistics import mean, stdev
+from app.core.metrics import observe
 
 class TradingBot:
     """
@@ -149,6 +150,7 @@ class TradingBot:
         }
 
     # ---- simple backtester ----
+    @observe("TradingBot.backtest")
     def backtest(self, prices: List[float], initial_capital: float = 1000.0, fee_pct: float = 0.0) -> Dict[str, Any]:
         """
         Run a single-pass backtest over the price series using the combined signal at each step.
@@ -0,0 +1,404 @@
+import atexit
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+AUDIT_DIR = os.getenv("AUDIT_DIR", "audit")
+AUDIT_SEGMENT_BYTES = int(os.getenv("AUDIT_SEGMENT_BYTES", str(64 * 2**20)))
+# group commit: a batch is written and fsynced once it has this many records or is this old
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "512"))
+AUDIT_FLUSH_MS = float(os.getenv("AUDIT_FLUSH_MS", "50"))
+# callers wait (rather than drop records) only if the writer falls this far behind
+AUDIT_QUEUE_LIMIT = 100_000
+
+GENESIS = "0" * 64
+NO_USER = -1
+# one fixed-size entry per record: time and both user columns for lookups, and where the line is
+INDEX_RECORD = struct.Struct("<qqqII")
+# the same layout as a numpy dtype, for the vectorized filters in query() (numpy is imported there)
+INDEX_FIELDS = [("ts", "<i8"), ("actor", "<i8"), ("user", "<i8"), ("offset", "<u4"), ("length", "<u4")]
+
+
+def _digest(prev: str, body: dict) -> str:
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256((prev + canonical).encode()).hexdigest()
+
+
+class _PartialWrite(Exception):
+    """
+    A batch write failed after its first `written` records reached disk.
+    """
+
+    def __init__(self, written: int):
+        super().__init__(f"failed after {written} records")
+        self.written = written
+
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) if size else None
+
+
+class AuditLog:
+    """
+    Append-only, hash-chained audit trail in local segment files. Requests
+    only append to an in-memory queue; a writer thread group-commits the
+    queue (one write and one fsync per batch), chaining every record to the
+    previous one by SHA-256, so editing or removing a line breaks verify().
+
+    Segments are "<first seq>.log" (one JSON record per line) with a binary
+    "<first seq>.idx" of INDEX_RECORD entries, rotated at segment_bytes.
+    Batches are written under an exclusive file lock and the chain tail is
+    re-read when another process wrote last, so several workers can share
+    one directory and one chain.
+    """
+
+    def __init__(self, directory: str = AUDIT_DIR, segment_bytes: int = AUDIT_SEGMENT_BYTES,
+                 batch_size: int = AUDIT_BATCH_SIZE, flush_ms: float = AUDIT_FLUSH_MS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._written = 0
+        self._enqueued = 0
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # chain tail, valid while the active segment still has the size we left it at
+        self._seq = 1
+        self._prev = GENESIS
+        self._segment: Optional[int] = None
+        self._size = 0
+        self.batches = 0
+
+    # ---- write path ----
+    def record(self, action: str, actor_id: Optional[int] = None, user_id: Optional[int] = None,
+               target: Optional[str] = None, **details):
+        self.record_many([(action, actor_id, user_id, target, details)])
+
+    def record_many(self, records: Iterable[tuple]):
+        now = time.time()
+        items = [(now, *r) for r in records]
+        if not items:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._start()
+            while len(self._queue) >= AUDIT_QUEUE_LIMIT:
+                self._cond.wait()
+            self._queue.extend(items)
+            self._enqueued += len(items)
+            self._cond.notify_all()
+
+    def _start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                # let the batch fill up to batch_size or flush_ms after its first record
+                deadline = self._queue[0][0] + self.flush_ms / 1000
+                while len(self._queue) < self.batch_size and not self._closed:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size * 4))]
+                self._cond.notify_all()
+            try:
+                self._write(batch)
+            except Exception as exc:
+                # only the records that did not reach disk go back on the queue
+                written = getattr(exc, "written", 0)
+                logger.exception("audit write failed after %d of %d records; retrying the rest", written, len(batch))
+                with self._cond:
+                    self._written += written
+                    self._queue.extendleft(reversed(batch[written:]))
+                    self._cond.notify_all()
+                time.sleep(1)
+                continue
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until everything recorded so far is on disk.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            target = self._enqueued
+            while self._written < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=10)
+
+    def _path(self, first_seq: int, ext: str) -> str:
+        return os.path.join(self.directory, f"{first_seq:012d}.{ext}")
+
+    def segments(self) -> List[int]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(n[:-4]) for n in names if n.endswith(".log") and n[:-4].isdigit())
+
+    def _write(self, batch: List[tuple]):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._sync_tail()
+                first, appended = self._seq, 0
+                try:
+                    lines, entries = [], []
+                    for ts, action, actor_id, user_id, target, details in batch:
+                        body = {
+                            "seq": self._seq,
+                            "ts": datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="milliseconds"),
+                            "action": action,
+                            "actor_id": actor_id,
+                            "user_id": user_id,
+                            "target": target,
+                            "details": details,
+                            "prev": self._prev,
+                        }
+                        body["hash"] = self._prev = _digest(self._prev, body)
+                        line = (json.dumps(body, sort_keys=True, separators=(",", ":"), default=str) + "\n").encode()
+                        if self._segment is None or (self._size and self._size + len(line) > self.segment_bytes):
+                            self._append(lines, entries)
+                            appended += len(lines)
+                            lines, entries = [], []
+                            self._segment, self._size = self._seq, 0
+                        entries.append((int(ts * 1000), NO_USER if actor_id is None else actor_id,
+                                        NO_USER if user_id is None else user_id, self._size, len(line)))
+                        lines.append(line)
+                        self._size += len(line)
+                        self._seq += 1
+                    self._append(lines, entries)
+                except Exception as exc:
+                    # records written before the failure (e.g. ahead of a rotation) stay on disk;
+                    # re-read the tail so the retry resumes after them instead of writing them twice
+                    self._segment = None
+                    try:
+                        self._sync_tail()
+                        appended = self._seq - first
+                    except Exception:
+                        logger.exception("audit tail re-read failed")
+                    raise _PartialWrite(appended) from exc
+                self.batches += 1
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _append(self, lines: List[bytes], entries: List[tuple]):
+        # log first, index second: an index entry never points past the log
+        if not lines:
+            return
+        for ext, data in (("log", b"".join(lines)), ("idx", b"".join(INDEX_RECORD.pack(*e) for e in entries))):
+            fd = os.open(self._path(self._segment, ext), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o640)
+            try:
+                os.write(fd, data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _sync_tail(self):
+        """
+        Pick up the chain tail from disk when this process did not write
+        last (or has not written yet), repairing a torn tail left by a crash.
+        """
+        segments = self.segments()
+        if self._segment is not None and segments and segments[-1] == self._segment \
+                and os.path.getsize(self._path(self._segment, "log")) == self._size:
+            return
+        while segments:
+            first = segments[-1]
+            last = self._repair(first)
+            if last is not None:
+                self._segment, self._size = first, os.path.getsize(self._path(first, "log"))
+                self._seq, self._prev = last["seq"] + 1, last["hash"]
+                return
+            # a segment created but never written: drop it and look further back
+            for ext in ("log", "idx"):
+                try:
+                    os.remove(self._path(first, ext))
+                except FileNotFoundError:
+                    pass
+            segments.pop()
+        self._segment, self._size, self._seq, self._prev = None, 0, 1, GENESIS
+
+    def _repair(self, first_seq: int) -> Optional[dict]:
+        log_path, idx_path = self._path(first_seq, "log"), self._path(first_seq, "idx")
+        log_size = os.path.getsize(log_path)
+        idx_size = os.path.getsize(idx_path) if os.path.exists(idx_path) else 0
+        count = idx_size // INDEX_RECORD.size
+        last_offset = last_length = 0
+        if count:
+            with open(idx_path, "rb") as idx:
+                idx.seek((count - 1) * INDEX_RECORD.size)
+                *_, last_offset, last_length = INDEX_RECORD.unpack(idx.read(INDEX_RECORD.size))
+        indexed_end = last_offset + last_length
+
+        with open(log_path, "rb+") as log:
+            log.seek(indexed_end)
+            tail = log.read()
+            complete = tail[:tail.rfind(b"\n") + 1]
+            if len(complete) != len(tail):
+                log.truncate(indexed_end + len(complete))
+            # lines that reached the log but not the index before a crash
+            missing, offset = [], indexed_end
+            for line in complete.splitlines(keepends=True):
+                rec = json.loads(line)
+                ts = int(datetime.fromisoformat(rec["ts"]).timestamp() * 1000)
+                missing.append((ts, NO_USER if rec["actor_id"] is None else rec["actor_id"],
+                                NO_USER if rec["user_id"] is None else rec["user_id"], offset, len(line)))
+                offset += len(line)
+            if idx_size != count * INDEX_RECORD.size or missing:
+                with open(idx_path, "ab+") as idx:
+                    idx.truncate(count * INDEX_RECORD.size)
+                    idx.write(b"".join(INDEX_RECORD.pack(*e) for e in missing))
+                logger.warning("audit segment %s repaired: %d index entries rebuilt", first_seq, len(missing))
+            if offset == 0:
+                return None
+            if missing:
+                last_offset, last_length = missing[-1][3:]
+            log.seek(last_offset)
+            return json.loads(log.read(last_length))
+
+    # ---- read path ----
+    def query(self, start: Optional[datetime] = None, end: Optional[datetime] = None, user_id: Optional[int] = None,
+              action: Optional[str] = None, before_seq: Optional[int] = None, limit: int = 100) -> List[dict]:
+        """
+        Newest-first records matching the filters. The index narrows each
+        segment to the matching line offsets in one vectorized pass; only
+        those lines are decoded from the memory-mapped log. user_id matches
+        either the actor or the affected user; pass the last seq seen as
+        before_seq for the next page.
+        """
+        import numpy as np
+
+        dtype = np.dtype(INDEX_FIELDS)
+        start_ms = int(start.replace(tzinfo=start.tzinfo or timezone.utc).timestamp() * 1000) if start else None
+        end_ms = int(end.replace(tzinfo=end.tzinfo or timezone.utc).timestamp() * 1000) if end else None
+        out = []
+        for first_seq in reversed(self.segments()):
+            if before_seq is not None and first_seq >= before_seq:
+                continue
+            index_map = _map(self._path(first_seq, "idx"))
+            if index_map is None:
+                continue
+            index = np.frombuffer(index_map, dtype=dtype, count=len(index_map) // dtype.itemsize)
+            try:
+                mask = np.ones(len(index), dtype=bool)
+                if start_ms is not None:
+                    mask &= index["ts"] >= start_ms
+                if end_ms is not None:
+                    mask &= index["ts"] < end_ms
+                if user_id is not None:
+                    mask &= (index["actor"] == user_id) | (index["user"] == user_id)
+                if before_seq is not None:
+                    mask[max(0, before_seq - first_seq):] = False
+                rows = np.flatnonzero(mask)[::-1]
+                if not len(rows):
+                    continue
+                spans = [(int(index["offset"][i]), int(index["length"][i])) for i in rows]
+            finally:
+                del index
+                index_map.close()
+
+            log_map = _map(self._path(first_seq, "log"))
+            try:
+                for offset, length in spans:
+                    rec = json.loads(log_map[offset:offset + length])
+                    if action is not None and rec["action"] != action:
+                        continue
+                    out.append(rec)
+                    if len(out) >= limit:
+                        return out
+            finally:
+                log_map.close()
+        return out
+
+    def verify(self) -> dict:
+        """
+        Recompute the whole chain. Reports the first record whose hash or
+        link does not match, or a gap in sequence numbers.
+        """
+        prev, expected, checked = GENESIS, 1, 0
+        for first_seq in self.segments():
+            log_map = _map(self._path(first_seq, "log"))
+            if log_map is None:
+                continue
+            try:
+                position = 0
+                while position < len(log_map):
+                    newline = log_map.find(b"\n", position)
+                    if newline < 0:
+                        return {"ok": False, "checked": checked, "error": f"torn record in segment {first_seq}"}
+                    rec = json.loads(log_map[position:newline])
+                    position = newline + 1
+                    stored = rec.pop("hash")
+                    if rec["seq"] != expected:
+                        return {"ok": False, "checked": checked, "seq": expected, "error": f"expected seq {expected}, found {rec['seq']}"}
+                    if rec["prev"] != prev or _digest(prev, rec) != stored:
+                        return {"ok": False, "checked": checked, "seq": rec["seq"], "error": "hash mismatch"}
+                    prev, expected, checked = stored, expected + 1, checked + 1
+            finally:
+                log_map.close()
+        return {"ok": True, "checked": checked, "head": prev}
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._queue)
+        segments = self.segments()
+        return {
+            "segments": len(segments),
+            "bytes": sum(os.path.getsize(self._path(s, "log")) for s in segments),
+            "pending": pending,
+            "written": self._written,
+            "batches": self.batches,
+        }
+
+
+audit_log = AuditLog()
+
+
+def audit(action: str, actor_id: Optional[int] = None, user_id: Optional[int] = None,
+          target: Optional[str] = None, **details):
+    audit_log.record(action, actor_id, user_id, target, **details)
+
+
+if __name__ == "__main__":
+    # usage: python -m app.core.audit [verify|stats]
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    print(json.dumps(audit_log.verify() if command == "verify" else audit_log.stats(), indent=2))
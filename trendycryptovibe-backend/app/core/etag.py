@@ -0,0 +1,77 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app.core.serialization import dumps
+
+# 0 disables the in-process response cache
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+MAX_CACHED_BODY_BYTES = 256 * 1024
+
+
+class ResponseCache:
+    """
+    Small LRU of encoded bodies keyed by ETag. The ETag embeds the version
+    counter, so a write never needs to invalidate anything: it just makes the
+    old key unreachable.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: str, body: bytes):
+        if self.max_entries <= 0 or len(body) > MAX_CACHED_BODY_BYTES:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+
+def make_etag(scope: str, user_id: int, version: int, request: Request) -> str:
+    # query params (cursor, limit, filters) select different bodies for the same version
+    query = hashlib.blake2b(str(sorted(request.query_params.multi_items())).encode(), digest_size=6).hexdigest()
+    return f'W/"{scope}-{user_id}-{version}-{query}"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # weak comparison: ignore W/ prefixes
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def conditional_json(request: Request, etag: str, build: Callable[[], Any]) -> Response:
+    """
+    304 when the client already has this version, else the cached or freshly
+    built JSON body. build() only runs on a cache miss.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(etag)
+    if body is None:
+        body = dumps(jsonable_encoder(build()))
+        response_cache.put(etag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
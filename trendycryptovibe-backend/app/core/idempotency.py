@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.idempotency import IdempotencyKey
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+MAX_KEY_LENGTH = 255
+
+
+def _stored(db: Session, user_id: int, key: str, fingerprint: str, ttl: float) -> Optional[Any]:
+    row = db.get(IdempotencyKey, (user_id, key))
+    if row is None:
+        return None
+    if row.created_at < datetime.utcnow() - timedelta(seconds=ttl):
+        # expired: the key is free again, the delete commits with the new write
+        db.delete(row)
+        db.flush()
+        return None
+    if row.fingerprint != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key reused with a different request")
+    return row.response
+
+
+def purge_expired(db: Session, ttl: float = DEFAULT_TTL_SECONDS) -> int:
+    """
+    Delete keys older than ttl; they can no longer be replayed. Returns the
+    number of rows removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    deleted = db.query(IdempotencyKey).filter(IdempotencyKey.created_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def idempotent(db: Session, user_id: int, key: Optional[str], fingerprint: str, fn: Callable[[], Any],
+               ttl: float = DEFAULT_TTL_SECONDS) -> Tuple[Any, bool]:
+    """
+    Return (response, replayed). fn writes through db without committing;
+    its writes and the key commit together, so a retry landing on any
+    worker replays the stored response instead of writing again.
+    Concurrent duplicates are not serialized: both run fn, but the key's
+    primary key lets only one commit, and the other rolls back its writes
+    and replays the winner. Failures store nothing. Expired keys are
+    removed by purge_expired(), which the outbox worker runs periodically.
+    """
+    if not key:
+        result = fn()
+        db.commit()
+        return result, False
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key too long")
+
+    stored = _stored(db, user_id, key, fingerprint, ttl)
+    if stored is not None:
+        return stored, True
+
+    result = fn()
+    db.flush()
+    db.add(IdempotencyKey(user_id=user_id, key=key, fingerprint=fingerprint, response=jsonable_encoder(result)))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        stored = _stored(db, user_id, key, fingerprint, ttl)
+        if stored is None:
+            raise
+        return stored, True
+    return result, False
@@ -0,0 +1,290 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Shards:
+    """
+    One array of slots per thread. The hot path only touches the calling
+    thread's own array, so recording never takes a lock; the registry lock
+    is only used when a thread records for the first time and on scrape.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._arrays: List[list] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> list:
+        arr = getattr(self._local, "arr", None)
+        if arr is None:
+            arr = [0.0] * self._size
+            with self._lock:
+                self._arrays.append(arr)
+            self._local.arr = arr
+        return arr
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            arrays = list(self._arrays)
+        return [sum(col) for col in zip(*arrays)] if arrays else [0.0] * self._size
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], _Shards] = {}
+        self._lock = threading.Lock()
+
+    def _slots(self) -> int:
+        return 1
+
+    def _child(self, labels: Tuple[str, ...]) -> _Shards:
+        child = self._children.get(labels)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labels, _Shards(self._slots()))
+        return child
+
+    def _label_str(self, labels: Tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labels)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, child in sorted(self._children.items()):
+            lines.extend(self._render_child(labels, child.totals()))
+        return lines
+
+    def _render_child(self, labels, totals) -> List[str]:
+        return [f"{self.name}{self._label_str(labels)} {_num(totals[0])}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._child(labels).mine()[0] += amount
+
+
+class Gauge(_Metric):
+    """
+    Up/down gauge; each thread accumulates its own delta and the scrape sums them.
+    """
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._child(labels).mine()[0] += amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self._child(labels).mine()[0] -= amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _slots(self) -> int:
+        # one slot per bucket, +Inf, sum, count
+        return len(self.buckets) + 3
+
+    def observe(self, value: float, *labels: str):
+        arr = self._child(labels).mine()
+        arr[bisect_left(self.buckets, value)] += 1
+        arr[-2] += value
+        arr[-1] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def _render_child(self, labels, totals) -> List[str]:
+        lines, cumulative = [], 0.0
+        for bound, count in zip((*self.buckets, float("inf")), totals):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float("inf") else 'le="%s"' % _num(bound)
+            lines.append(f"{self.name}_bucket{self._label_str(labels, le)} {_num(cumulative)}")
+        lines.append(f"{self.name}_sum{self._label_str(labels)} {_num(totals[-2])}")
+        lines.append(f"{self.name}_count{self._label_str(labels)} {_num(totals[-1])}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        # scrape-time callback for values that already live elsewhere
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method", "group")))
+DB_QUERY_LATENCY = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("statement",)))
+DB_POOL_CHECKED_OUT = registry.register(Gauge(
+    "db_pool_connections_checked_out", "Connections currently checked out of the pool"))
+DB_POOL_HOLD = registry.register(Histogram(
+    "db_pool_checkout_duration_seconds", "Time a connection stays checked out of the pool"))
+ANALYTICS_LATENCY = registry.register(Histogram(
+    "analytics_duration_seconds", "Time spent in analytics functions and their phases", ("function",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)))
+RESPONSE_ENCODE_LATENCY = registry.register(Histogram(
+    "http_response_encode_seconds", "Time spent encoding JSON response bodies"))
+
+
+def observe(function: str):
+    """
+    Decorator recording the wrapped function's wall time in
+    analytics_duration_seconds{function=...}.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                ANALYTICS_LATENCY.observe(time.perf_counter() - start, function)
+        return wrapper
+    return decorator
+
+
+_SQL_VERBS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def instrument_engine(engine):
+    """
+    Attach SQLAlchemy event hooks for statement timings and pool usage.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_query_start")
+        if starts:
+            verb = statement.lstrip()[:6].upper()
+            DB_QUERY_LATENCY.observe(time.perf_counter() - starts.pop(), verb if verb in _SQL_VERBS else "OTHER")
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # a failed statement never reaches after_cursor_execute; drop its start so the stack stays balanced
+        starts = context.connection.info.get("_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        record.info["_checkout_at"] = time.perf_counter()
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_conn, record):
+        started = record.info.pop("_checkout_at", None)
+        if started is not None:
+            DB_POOL_CHECKED_OUT.dec()
+            DB_POOL_HOLD.observe(time.perf_counter() - started)
+
+
+def _route_paths(routes, prefix: str = ""):
+    for route in routes:
+        if hasattr(route, "path"):
+            yield prefix + route.path
+        elif hasattr(route, "original_router"):
+            # newer FastAPI keeps an included router as one entry with its own routes
+            yield from _route_paths(route.original_router.routes, prefix + route.include_context.prefix)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency and in-flight requests.
+    Latency is labelled by the route template the router resolved
+    (/transactions/approve/{tx_id}); in-flight requests are counted before
+    routing, so they are labelled by the router prefix (/transactions), or
+    "unmatched" when no route starts with the path's first segment.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_count = -1
+        self._groups = frozenset()
+
+    def _group(self, scope) -> str:
+        # the prefixes are re-read whenever the app's route list changes size
+        routes = getattr(scope.get("app"), "routes", ())
+        if len(routes) != self._route_count:
+            self._groups = frozenset("/" + path.lstrip("/").split("/", 1)[0] for path in _route_paths(routes))
+            self._route_count = len(routes)
+        group = "/" + scope["path"].lstrip("/").split("/", 1)[0]
+        return group if group in self._groups else "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        group = self._group(scope)
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method, group)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(method, group)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_LATENCY.observe(time.perf_counter() - start, method, route, status)
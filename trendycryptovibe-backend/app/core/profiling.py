@@ -0,0 +1,297 @@
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from jose import jwt, JWTError
+from starlette.concurrency import run_in_threadpool
+from app.auth.jwt_handler import SECRET_KEY, ALGORITHM
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+# fraction of all requests profiled in the background; 0 disables it
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+# how long an X-Profile admin check is reused for the same bearer token
+PROFILE_ADMIN_CACHE_SECONDS = 60.0
+PROFILE_ADMIN_CACHE_SIZE = 1024
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = re.compile(rb"(^|&)profile=(1|true)(&|$)")
+PROFILE_ID = re.compile(r"^[0-9]{13}-[0-9a-f]{8}$")
+
+# leaf frames in these files are threads parked on a lock or the event loop selector
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+# the sampler profiling the current request; copied into the worker thread of a sync endpoint
+_active_sampler: contextvars.ContextVar = contextvars.ContextVar("profile_sampler", default=None)
+
+
+class StackSampler:
+    """
+    Background thread that snapshots the profiled request's Python stacks
+    each `interval` seconds and counts them as collapsed "root;...;leaf"
+    stacks, the input format of flamegraph.pl and speedscope. Async code
+    runs on the loop thread (`loop_ident`) and sync endpoints in a
+    threadpool worker; a worker is sampled only while it runs a call whose
+    context carries this sampler, so other requests' endpoints stay out.
+    Async requests interleaved on the loop thread can still show up.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, loop_ident: Optional[int] = None):
+        self.interval = interval
+        self.loop_ident = loop_ident
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me or frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                if ident != self.loop_ident and not self._serves(frame):
+                    continue
+                self.stacks[_collapse(frame)] += 1
+            self.samples += 1
+
+    def _serves(self, frame) -> bool:
+        # anyio's worker runs each call as context.run(func) from its run() loop, with the
+        # context copied from the awaiting request
+        while frame is not None:
+            if frame.f_code.co_name == "run":
+                context = frame.f_locals.get("context")
+                if isinstance(context, contextvars.Context):
+                    return context.get(_active_sampler) is self
+            frame = frame.f_back
+        return False
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({_short(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# project root (the directory holding main.py), so app frames read app/ai/...
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+
+
+def _short(filename: str) -> str:
+    if filename.startswith(_ROOT):
+        return filename[len(_ROOT):]
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker != -1:
+        return filename[marker + len("site-packages" + os.sep):]
+    return os.path.basename(filename)
+
+
+class ProfileStore:
+    """
+    Bounded on-disk ring: each profile is <id>.json (metadata) plus
+    <id>.folded (collapsed stacks). Ids start with the epoch millis, so name
+    order is age order and the oldest pairs are dropped past max_files.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def new_id(self) -> str:
+        return f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+
+    def _path(self, profile_id: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{ext}")
+
+    def save(self, profile_id: str, meta: dict, stacks: Counter):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(profile_id, "folded"), "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            # metadata last: a profile is only listed once both files exist
+            with open(self._path(profile_id, "json"), "w") as f:
+                json.dump(meta, f)
+            self._trim()
+
+    def _trim(self):
+        ids = self.ids()
+        for stale in ids[:max(0, len(ids) - self.max_files)]:
+            for ext in ("json", "folded"):
+                try:
+                    os.remove(self._path(stale, ext))
+                except FileNotFoundError:
+                    pass
+
+    def ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(n[:-5] for n in names if n.endswith(".json") and PROFILE_ID.match(n[:-5]))
+
+    def list(self) -> List[dict]:
+        profiles = []
+        for profile_id in reversed(self.ids()):
+            meta = self.meta(profile_id)
+            if meta is not None:
+                profiles.append(meta)
+        return profiles
+
+    def meta(self, profile_id: str) -> Optional[dict]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id, "json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def folded_path(self, profile_id: str) -> Optional[str]:
+        if self.meta(profile_id) is None:
+            return None
+        return self._path(profile_id, "folded")
+
+
+store = ProfileStore()
+
+
+def _bearer_user_id(scope) -> Optional[int]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            try:
+                return jwt.decode(value[7:].decode(), SECRET_KEY, algorithms=[ALGORITHM]).get("user_id")
+            except JWTError:
+                return None
+    return None
+
+
+def _is_admin(user_id: int) -> bool:
+    from app.db.database import SessionLocal
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        return user is not None and "admin" in [role.name for role in user.roles]
+    finally:
+        db.close()
+
+
+# bearer token -> (checked at, admin); a client repeating X-Profile costs one lookup per minute
+_admin_checks: Dict[bytes, Tuple[float, bool]] = {}
+
+
+def _bearer_token(scope) -> Optional[bytes]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            return value
+    return None
+
+
+async def _profiling_allowed(scope) -> bool:
+    token = _bearer_token(scope)
+    if token is None:
+        return False
+    now = time.monotonic()
+    cached = _admin_checks.get(token)
+    if cached is not None and now - cached[0] < PROFILE_ADMIN_CACHE_SECONDS:
+        return cached[1]
+    user_id = _bearer_user_id(scope)
+    allowed = user_id is not None and await run_in_threadpool(_is_admin, user_id)
+    if len(_admin_checks) >= PROFILE_ADMIN_CACHE_SIZE:
+        _admin_checks.clear()
+    _admin_checks[token] = (now, allowed)
+    return allowed
+
+
+def _requested(scope) -> bool:
+    if PROFILE_QUERY.search(scope.get("query_string", b"")):
+        return True
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER:
+            return value in (b"1", b"true")
+    return False
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware. A request is profiled when an admin sends
+    `X-Profile: 1` (or `?profile=1`), or when it falls in the random
+    PROFILE_SAMPLE_RATE fraction. The response carries X-Profile-Id, and the
+    profile is fetched from /admin/profiles. Every other request only pays
+    for the flag check; the admin check behind X-Profile is cached per token.
+    """
+
+    def __init__(self, app, profiles: ProfileStore = store, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.profiles = profiles
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        reason = None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            reason = "sampled"
+        # a non-admin asking for a profile is served normally
+        if _requested(scope) and await _profiling_allowed(scope):
+            reason = "requested"
+        if reason is None:
+            return await self.app(scope, receive, send)
+
+        profile_id = self.profiles.new_id()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = StackSampler(loop_ident=threading.get_ident())
+        started_at = time.time()
+        start = time.perf_counter()
+        sampler.start()
+        token = _active_sampler.set(sampler)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active_sampler.reset(token)
+            sampler.stop()
+            meta = {
+                "id": profile_id,
+                "reason": reason,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status,
+                "started_at": started_at,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "interval_ms": sampler.interval * 1000,
+                "samples": sampler.samples,
+            }
+            # background samples of trivially fast requests are not worth a ring slot
+            if reason == "requested" or sampler.samples:
+                await run_in_threadpool(self.profiles.save, profile_id, meta, sampler.stacks)
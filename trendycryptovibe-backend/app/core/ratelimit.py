@@ -0,0 +1,240 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from jose import jwt, JWTError
+from starlette.concurrency import run_in_threadpool
+from app.auth.jwt_handler import SECRET_KEY, ALGORITHM
+from app.core.metrics import registry
+
+
+@dataclass
+class Rule:
+    """
+    Token bucket per (route, caller): `rate` tokens/second refill up to
+    `burst`. A request costs 1 token plus 1 per `items_per_token` prices in
+    the body, so one huge backtest drains the bucket like many small ones.
+    """
+    name: str
+    rate: float
+    burst: float
+    items_per_token: int = 1000
+    max_body_bytes: int = 8 * 1024 * 1024
+
+    def cost(self, body: bytes) -> float:
+        # comma count approximates the array length without parsing the JSON
+        items = body.count(b",") + 1 if body else 0
+        return 1.0 + items / self.items_per_token
+
+    @property
+    def max_items(self) -> int:
+        # the largest request a full bucket can pay for
+        return int((self.burst - 1.0) * self.items_per_token)
+
+
+# path -> rule; the AI endpoints are CPU bound, so they are the ones limited
+DEFAULT_RULES: Dict[str, Rule] = {
+    "/bot/backtest": Rule("backtest", rate=0.5, burst=10, items_per_token=500),
+    "/bot/backtest/quant": Rule("backtest_quant", rate=0.5, burst=10, items_per_token=2000),
+    "/bot/signal": Rule("signal", rate=5, burst=30),
+    "/predict": Rule("predict", rate=5, burst=30),
+    "/predict/batch": Rule("predict_batch", rate=1, burst=20, items_per_token=50),
+}
+
+
+class MemoryBackend:
+    """
+    Buckets sharded over independent locks so concurrent callers rarely
+    contend. Idle buckets (which would be full again) are swept lazily.
+    """
+    blocking = False
+
+    def __init__(self, shards: int = 16, sweep_every: int = 10000):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self._sweep_every = sweep_every
+        self._ops = [0] * shards
+
+    def consume(self, key: str, cost: float, rate: float, burst: float) -> Tuple[bool, float, float]:
+        index = hash(key) % len(self._shards)
+        buckets, lock = self._shards[index]
+        now = time.monotonic()
+        with lock:
+            tokens, last = buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= cost:
+                buckets[key] = (tokens - cost, now)
+                allowed, retry_after = True, 0.0
+            else:
+                buckets[key] = (tokens, now)
+                allowed, retry_after = False, (cost - tokens) / rate
+
+            self._ops[index] += 1
+            if self._ops[index] >= self._sweep_every:
+                self._ops[index] = 0
+                idle = [k for k, (t, ts) in buckets.items() if t + (now - ts) * rate >= burst]
+                for k in idle:
+                    del buckets[k]
+            remaining = buckets[key][0] if key in buckets else burst
+        return allowed, retry_after, remaining
+
+
+class RedisBackend:
+    """
+    Shared buckets for multi-worker deployments (optional `redis` package).
+    The refill/consume step runs atomically as a Lua script.
+    """
+    blocking = True
+    SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 't') or ARGV[3])
+    local last = tonumber(redis.call('HGET', KEYS[1], 'ts') or ARGV[4])
+    local rate, burst, now, cost = tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[1])
+    tokens = math.min(burst, tokens + (now - last) * rate)
+    local allowed = 0
+    if tokens >= cost then tokens = tokens - cost; allowed = 1 end
+    redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def consume(self, key: str, cost: float, rate: float, burst: float) -> Tuple[bool, float, float]:
+        allowed, tokens = self._script(keys=[f"ratelimit:{key}"], args=[cost, rate, burst, time.time()])
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (cost - tokens) / rate, tokens
+
+
+class RateLimiter:
+    def __init__(self, rules: Dict[str, Rule], backend=None):
+        self.rules = rules
+        self.backend = backend or MemoryBackend()
+        # (rule, outcome) -> count; plain dict increments are cheap enough here
+        self._counters: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def rule_for(self, path: str) -> Optional[Rule]:
+        return self.rules.get(path.rstrip("/") or "/")
+
+    def count(self, rule: Rule, outcome: str):
+        self._counters[(rule.name, outcome)] += 1
+
+    def counters(self) -> Dict[Tuple[str, str], int]:
+        return dict(self._counters)
+
+    def render_metrics(self):
+        lines = ["# HELP rate_limit_requests_total Rate-limited route decisions",
+                 "# TYPE rate_limit_requests_total counter"]
+        for (rule, outcome), count in sorted(self.counters().items()):
+            lines.append(f'rate_limit_requests_total{{rule="{rule}",outcome="{outcome}"}} {count}')
+        return lines
+
+
+def _caller(scope) -> str:
+    # user id from the bearer token when present, else the client address
+    for name, value in scope.get("headers", []):
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            try:
+                user_id = jwt.decode(value[7:].decode(), SECRET_KEY, algorithms=[ALGORITHM]).get("user_id")
+                if user_id is not None:
+                    return f"user:{user_id}"
+            except JWTError:
+                pass
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+async def _send_json(send, status: int, payload: dict, headers=()):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware: unlimited routes pass straight through; limited
+    routes have their body buffered once to price the request.
+    """
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        rule = self.limiter.rule_for(scope["path"]) if scope["type"] == "http" else None
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > rule.max_body_bytes:
+                self.limiter.count(rule, "too_large")
+                return await _send_json(send, 413, {"detail": "Request body too large"})
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        cost = rule.cost(body)
+        if cost > rule.burst:
+            # no amount of waiting would let this through; say so instead of a 429 forever
+            self.limiter.count(rule, "too_large")
+            return await _send_json(send, 413, {"detail": f"At most {rule.max_items} items per request"})
+
+        args = (f"{rule.name}:{_caller(scope)}", cost, rule.rate, rule.burst)
+        if self.limiter.backend.blocking:
+            allowed, retry_after, remaining = await run_in_threadpool(self.limiter.backend.consume, *args)
+        else:
+            allowed, retry_after, remaining = self.limiter.backend.consume(*args)
+
+        if not allowed:
+            self.limiter.count(rule, "limited")
+            return await _send_json(
+                send, 429, {"detail": "Rate limit exceeded"},
+                headers=[(b"retry-after", str(max(1, math.ceil(retry_after))).encode())],
+            )
+        self.limiter.count(rule, "allowed")
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-ratelimit-remaining", str(int(remaining)).encode())]
+            await send(message)
+
+        await self.app(scope, replay, send_with_headers)
+
+
+def build_limiter() -> RateLimiter:
+    # RATE_LIMIT_ENABLED=0 keeps the middleware but limits nothing (load tests)
+    if os.getenv("RATE_LIMIT_ENABLED", "1") != "1":
+        return RateLimiter({})
+    redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+    return RateLimiter(DEFAULT_RULES, RedisBackend(redis_url) if redis_url else MemoryBackend())
+
+
+rate_limiter = build_limiter()
+registry.add_collector(rate_limiter.render_metrics)
@@ -0,0 +1,116 @@
+import json
+import struct
+import sys
+import time
+from array import array
+from typing import Any, List, Sequence, Tuple
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from app.core.metrics import RESPONSE_ENCODE_LATENCY
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+BINARY_MEDIA_TYPE = "application/x-columnar"
+BINARY_MAGIC = b"COL1"
+_DTYPES = {"f8": "d", "i4": "i", "i1": "b"}
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    App-wide default response class: orjson encoding when installed.
+    """
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = dumps(content)
+        RESPONSE_ENCODE_LATENCY.observe(time.perf_counter() - start)
+        return body
+
+
+def wants_binary(request: Request) -> bool:
+    return BINARY_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def pack_columns(header: dict, columns: List[Tuple[str, str, Sequence]]) -> bytes:
+    """
+    Columnar binary frame:
+      b"COL1" | uint32 LE header length | UTF-8 JSON header | 8-byte aligned arrays
+    The header carries the scalar fields plus, per column, its name, dtype
+    ("f8", "i4", "i1"; all little-endian), length and byte offset from the
+    start of the frame, e.g. numpy.frombuffer(buf, "<f8", count, offset).
+    """
+    blobs = []
+    for name, dtype, values in columns:
+        arr = array(_DTYPES[dtype], values)
+        if sys.byteorder == "big":
+            arr.byteswap()
+        blobs.append((name, dtype, len(arr), arr.tobytes()))
+
+    def header_bytes(offsets):
+        meta = dict(header)
+        meta["columns"] = [
+            {"name": name, "dtype": dtype, "length": length, "offset": off}
+            for (name, dtype, length, _), off in zip(blobs, offsets)
+        ]
+        return dumps(meta)
+
+    # offsets depend on the header size and vice versa: iterate until stable
+    offsets = [0] * len(blobs)
+    while True:
+        head = header_bytes(offsets)
+        pos = _align(len(BINARY_MAGIC) + 4 + len(head))
+        new_offsets = []
+        for _, _, _, raw in blobs:
+            new_offsets.append(pos)
+            pos = _align(pos + len(raw))
+        if new_offsets == offsets:
+            break
+        offsets = new_offsets
+
+    out = bytearray(BINARY_MAGIC + struct.pack("<I", len(head)) + head)
+    for (_, _, _, raw), off in zip(blobs, offsets):
+        out.extend(b"\0" * (off - len(out)))
+        out.extend(raw)
+    return bytes(out)
+
+
+def _align(n: int, to: int = 8) -> int:
+    return (n + to - 1) // to * to
+
+
+def binary_response(header: dict, columns: List[Tuple[str, str, Sequence]]) -> Response:
+    return Response(content=pack_columns(header, columns), media_type=BINARY_MEDIA_TYPE)
+
+
+def downsample(values: Sequence[float], max_points: int) -> Tuple[List[int], List[float]]:
+    """
+    Reduce a series to about max_points while keeping its shape: the first
+    and last point plus the min and max of each bucket, so peaks and
+    drawdowns survive. Returns (indices, values).
+    """
+    n = len(values)
+    if max_points <= 0 or n <= max_points:
+        return list(range(n)), list(values)
+
+    buckets = max(1, (max_points - 2) // 2)
+    step = (n - 2) / buckets
+    keep = [0]
+    for b in range(buckets):
+        start = 1 + int(b * step)
+        end = 1 + int((b + 1) * step)
+        if end <= start:
+            continue
+        lo = min(range(start, end), key=values.__getitem__)
+        hi = max(range(start, end), key=values.__getitem__)
+        keep.extend(sorted({lo, hi}))
+    keep.append(n - 1)
+    return keep, [values[i] for i in keep]
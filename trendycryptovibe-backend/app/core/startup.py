@@ -0,0 +1,31 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger("uvicorn.error")
+
+# step name -> seconds, in the order the steps ran
+STARTUP_TIMINGS: Dict[str, float] = {}
+_process_start = time.perf_counter()
+
+
+@contextmanager
+def timed(step: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[step] = time.perf_counter() - start
+
+
+def report() -> str:
+    lines = ["Startup time by step:"]
+    for step, seconds in STARTUP_TIMINGS.items():
+        lines.append(f"  {seconds * 1000:9.1f} ms  {step}")
+    lines.append(f"  {(time.perf_counter() - _process_start) * 1000:9.1f} ms  total since app.core.startup import")
+    return "\n".join(lines)
+
+
+def log_report():
+    logger.info(report())
@@ -1,17 +1,41 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.core.metrics import instrument_engine
 
-DATABASE_URL = "sqlite:///./database.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
+# e.g. "journal_mode=WAL,synchronous=NORMAL"; run on every new SQLite connection
+SQLITE_PRAGMAS = os.getenv("SQLITE_PRAGMAS", "")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+_sqlite = DATABASE_URL.startswith("sqlite")
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if _sqlite else {})
+instrument_engine(engine)
+
+if _sqlite and SQLITE_PRAGMAS:
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS.split(","):
+            cursor.execute(f"PRAGMA {pragma.strip()}")
+        cursor.close()
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
 def get_db():
-    db = sessionLocal()
+    db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def init_db():
+    """
+    Create missing tables for local/dev runs. Deployed databases are managed
+    by Alembic, so set AUTO_CREATE_SCHEMA=0 there to skip the metadata scan.
+    """
+    if os.getenv("AUTO_CREATE_SCHEMA", "1") != "1":
+        return
+    from app.models import user, profile, role, wallets, transactions, balances, outbox, versions, paper, idempotency  # noqa: F401
+    Base.metadata.create_all(bind=engine)
@@ -0,0 +1,54 @@
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """
+    Opaque cursor pointing at the last row of a page: "<iso timestamp>|<id>"
+    """
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query, ts_column, id_column, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    Newest-first keyset pagination on (timestamp, id).
+    Seeks past the cursor instead of using OFFSET, so every page costs the
+    same index range scan no matter how deep into the history it is.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if cursor:
+        last_ts, last_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                ts_column < last_ts,
+                and_(ts_column == last_ts, id_column < last_id),
+            )
+        )
+
+    # fetch one extra row to know whether another page exists
+    rows = query.order_by(ts_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, ts_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
@@ -1,9 +1,11 @@
 import time
 import requests
 from app.ai.trading_bot import TradingBot
+from app.core.metrics import observe
 
 BINANCE_KLINES = "https://api.binance.com/api/v3/klines"
 
+@observe("fetch_binance_closes")
 def fetch_binance_closes(symbol="BTCUSDT", interval="1d", limit=500):
     """
     Returns a list of floats (close prices).
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, UniqueConstraint
+from datetime import datetime
+from app.db.database import Base
+
+class Balance(Base):
+    """
+    Materialized holdings per (user, currency), maintained incrementally
+    from ledger entries when transactions are approved.
+    """
+    __tablename__ = "balances"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    currency = Column(String, primary_key=True)
+    amount = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class LedgerEntry(Base):
+    """
+    Double-entry journal: every approved transaction writes one row on the
+    user's account and an opposite row on the external account, so entries
+    for a transaction always sum to zero.
+    """
+    __tablename__ = "ledger_entries"
+
+    id = Column(Integer, primary_key=True)
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    account = Column(String, nullable=False)
+    currency = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # applying the same transaction twice fails instead of double-counting
+    __table_args__ = (
+        UniqueConstraint("transaction_id", "account", name="uq_ledger_entries_transaction_account"),
+    )
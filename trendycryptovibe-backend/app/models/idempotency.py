@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey
+from datetime import datetime
+from app.db.database import Base
+
+class IdempotencyKey(Base):
+    """
+    A client's Idempotency-Key with the response it produced, committed
+    together with the write it guards. The primary key makes a duplicate
+    lose at commit on whichever worker it lands.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
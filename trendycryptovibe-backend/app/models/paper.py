@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.db.database import Base
+
+class PaperAccount(Base):
+    """
+    Simulated account that runs one strategy on one symbol. Cash and the
+    open position are owned by app.services.paper_trading, which keeps every
+    active account in memory and writes changes back in batches; `version`
+    makes those writes conditional, so two books can never both apply.
+    """
+    __tablename__ = "paper_accounts"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    symbol = Column(String, nullable=False)
+    interval = Column(String, nullable=False, default="1h")
+    strategy = Column(String, nullable=False, default="combined")
+    fee_pct = Column(Float, nullable=False, default=0.001)
+    initial_capital = Column(Float, nullable=False)
+    cash = Column(Float, nullable=False)
+    qty = Column(Float, nullable=False, default=0.0)
+    entry_price = Column(Float, nullable=True)
+    last_price = Column(Float, nullable=True)
+    equity = Column(Float, nullable=False)
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    closed_at = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    user = relationship("User")
+
+class PaperOrder(Base):
+    __tablename__ = "paper_orders"
+
+    id = Column(Integer, primary_key=True)
+    account_id = Column(Integer, ForeignKey("paper_accounts.id"), nullable=False, index=True)
+    side = Column(String, nullable=False)
+    qty = Column(Float, nullable=False)
+    price = Column(Float, nullable=False)
+    fee = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
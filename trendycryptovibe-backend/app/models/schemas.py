@@ -1,5 +1,7 @@
 
-from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, confloat
 
 class UserCreate(BaseModel):
     email: str
@@ -15,3 +17,104 @@ class UserResponse(BaseModel):
 
     class Config:
         orm_mode = True
+        # pydantic 2 name for orm_mode; keeps from_orm working on both majors
+        from_attributes = True
+
+class TransactionResponse(BaseModel):
+    id: int
+    amount: float
+    tx_type: str
+    currency: str
+    status: str
+    timestamp: Optional[datetime]
+    user_id: Optional[int]
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+class TransactionResult(BaseModel):
+    message: str
+    transaction: TransactionResponse
+
+class TransactionPage(BaseModel):
+    items: List[TransactionResponse]
+    next_cursor: Optional[str] = None
+
+class BulkStatusUpdate(BaseModel):
+    # either explicit ids or a filter over pending transactions
+    ids: Optional[List[int]] = None
+    user_id: Optional[int] = None
+    tx_type: Optional[str] = None
+    before: Optional[datetime] = None
+
+class UserImport(BaseModel):
+    email: str
+    password: Optional[str] = None
+    password_hash: Optional[str] = None
+    username: Optional[str] = None
+    phone_number: Optional[str] = None
+    bio: Optional[str] = None
+    roles: List[str] = ["user"]
+
+# prices feed ratios and logs, so zero and negatives are rejected up front
+Price = confloat(gt=0)
+
+class PredictBatchRequest(BaseModel):
+    # either stored candles by symbol or raw price windows
+    symbols: Optional[List[str]] = None
+    interval: str = "1h"
+    series: Optional[List[List[Price]]] = None
+
+class BalanceResponse(BaseModel):
+    currency: str
+    amount: float
+    updated_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+class PaperAccountCreate(BaseModel):
+    symbol: str
+    strategy: str = "combined"
+    interval: str = "1h"
+    initial_capital: float = 1000.0
+    fee_pct: float = 0.001
+
+class PaperAccountResponse(BaseModel):
+    id: int
+    symbol: str
+    interval: str
+    strategy: str
+    fee_pct: float
+    initial_capital: float
+    cash: float
+    qty: float
+    entry_price: Optional[float]
+    last_price: Optional[float]
+    equity: float
+    active: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+class PaperOrderResponse(BaseModel):
+    id: int
+    account_id: int
+    side: str
+    qty: float
+    price: float
+    fee: float
+    created_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+class PaperOrderPage(BaseModel):
+    items: List[PaperOrderResponse]
+    next_cursor: Optional[str] = None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -9,9 +9,17 @@ class Transaction(Base):
     id = Column(Integer, primary_key=True)
     amount = Column(Float, nullable=False)
     tx_type = Column(String, nullable=False)
+    currency = Column(String, nullable=False, default="USDT", server_default="USDT")
     status = Column(String, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     user_id = Column(Integer, ForeignKey("users.id"))
 
     user = relationship("User", back_populates="transactions")
+
+    # keyset pagination walks (timestamp, id) newest-first within these prefixes
+    __table_args__ = (
+        Index("ix_transactions_user_id_timestamp", "user_id", "timestamp", "id"),
+        Index("ix_transactions_status_timestamp", "status", "timestamp", "id"),
+        Index("ix_transactions_timestamp", "timestamp", "id"),
+    )
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from app.db.database import Base
+
+class UserVersion(Base):
+    """
+    Per-user change counters, bumped in the same commit as the writes they
+    describe. ETags on read endpoints are derived from them.
+    """
+    __tablename__ = "user_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    wallets = Column(Integer, nullable=False, default=0)
+    transactions = Column(Integer, nullable=False, default=0)
+    balances = Column(Integer, nullable=False, default=0, server_default="0")
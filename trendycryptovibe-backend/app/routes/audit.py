@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from app.auth.permissions import admin_required
+from app.core.audit import audit_log
+
+router = APIRouter(prefix="/admin/audit", tags=["Audit"])
+
+@router.get("/")
+def query_audit_log(start: Optional[datetime] = None,
+                    end: Optional[datetime] = None,
+                    user_id: Optional[int] = None,
+                    action: Optional[str] = None,
+                    before_seq: Optional[int] = None,
+                    limit: int = Query(100, ge=1, le=1000),
+                    current_user=Depends(admin_required)):
+    """
+    Audit records newest first. user_id matches the acting or the affected
+    user; pass next_before_seq back as before_seq for the next page.
+    """
+    # include what this worker recorded a moment ago
+    audit_log.flush(timeout=1.0)
+    items = audit_log.query(start, end, user_id, action, before_seq, limit)
+    return {"items": items, "next_before_seq": items[-1]["seq"] if len(items) == limit else None}
+
+@router.get("/verify")
+def verify_audit_log(current_user=Depends(admin_required)):
+    """
+    Recompute the hash chain over every segment.
+    """
+    audit_log.flush(timeout=1.0)
+    return {**audit_log.verify(), **audit_log.stats()}
@@ -0,0 +1,59 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.db.pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.models.paper import PaperAccount, PaperOrder
+from app.models.schemas import PaperAccountCreate, PaperAccountResponse, PaperOrderPage
+from app.auth.jwt_handler import get_current_user
+from app.auth.permissions import admin_required
+
+router = APIRouter(prefix="/paper", tags=["PaperTrading"])
+
+def _own_account(db: Session, account_id: int, user_id: int) -> PaperAccount:
+    account = db.query(PaperAccount).filter(PaperAccount.id == account_id, PaperAccount.user_id == user_id).first()
+    if not account:
+        raise HTTPException(status_code=404, detail="Paper account not found")
+    return account
+
+@router.post("/accounts", response_model=PaperAccountResponse)
+def create_paper_account(payload: PaperAccountCreate, db: Session = Depends(get_db),
+                         current_user=Depends(get_current_user)):
+    from app.services import paper_trading
+
+    try:
+        return paper_trading.create_account(
+            db, current_user.id, payload.symbol, payload.strategy, payload.interval,
+            payload.initial_capital, payload.fee_pct,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/accounts", response_model=List[PaperAccountResponse])
+def my_paper_accounts(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    return db.query(PaperAccount).filter(PaperAccount.user_id == current_user.id).order_by(PaperAccount.id).all()
+
+@router.delete("/accounts/{account_id}", response_model=PaperAccountResponse)
+def close_paper_account(account_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    from app.services import paper_trading
+
+    account = _own_account(db, account_id, current_user.id)
+    if account.active:
+        paper_trading.close_account(db, account)
+    return account
+
+@router.get("/accounts/{account_id}/orders", response_model=PaperOrderPage)
+def paper_orders(account_id: int, cursor: Optional[str] = None,
+                 limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                 db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    _own_account(db, account_id, current_user.id)
+    query = db.query(PaperOrder).filter(PaperOrder.account_id == account_id)
+    items, next_cursor = keyset_page(query, PaperOrder.created_at, PaperOrder.id, cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+# admin: run one engine tick now (deployments without PAPER_TRADING_WORKER=1)
+@router.post("/step")
+def run_paper_step(refresh: bool = False, db: Session = Depends(get_db), current_user=Depends(admin_required)):
+    from app.services import paper_trading
+
+    return paper_trading.run_step(db, refresh=refresh)
@@ -1,17 +1,55 @@
-from app.ai.predictor import prediction
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from typing import List
+from app.models.schemas import Price, PredictBatchRequest
 
 router = APIRouter(prefix='/predict', tags=["AI"])
+MAX_BATCH = 500
 
 @router.post("/")
-def predict_price(prices: List[float]):
+def predict_price(prices: List[Price]):
     """
     Send a list of last market prices:
     example:
     {
         "prices: [100, 103, 104, 102, 105]
     }
+    Uses the trained model when one is deployed and the history covers the
+    feature warm-up, the momentum rule otherwise.
     """
-    result = siple_prediction(prices)
-    return{"signal": result}
+    from app.ai.predictor import predict_series
+
+    result = predict_series([prices])[0]
+    return{"signal": result["signal"], "model_version": result["model_version"],
+           "probabilities": result.get("probabilities")}
+
+
+@router.post("/batch")
+def predict_batch(payload: PredictBatchRequest):
+    """
+    Many predictions in one model call. Either stored candles by symbol,
+    limited to the scanned universe (SCAN_UNIVERSE):
+    {
+      "symbols": ["BTCUSDT", "ETHUSDT"],
+      "interval": "1h"
+    }
+    or raw price windows:
+    {
+      "series": [[100, 101, ...], [20.1, 20.3, ...]]
+    }
+    """
+    from app.ai.predictor import predict_series, predict_symbols
+
+    symbols, series = payload.symbols, payload.series
+    items = symbols if symbols is not None else series
+    if not items:
+        raise HTTPException(status_code=400, detail="Provide a non-empty list under 'symbols' or 'series'.")
+    if len(items) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH} items per batch.")
+
+    if symbols is not None:
+        interval = payload.interval
+        try:
+            return {"interval": interval, "results": predict_symbols([s.upper() for s in symbols], interval)}
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    return {"results": predict_series(series)}
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from app.auth.permissions import admin_required
+from app.core.profiling import store
+
+router = APIRouter(prefix="/admin/profiles", tags=["Profiling"])
+
+@router.get("/")
+def list_profiles(current_user=Depends(admin_required)):
+    """
+    Stored request profiles, newest first.
+    """
+    return store.list()
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str, current_user=Depends(admin_required)):
+    meta = store.meta(profile_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return meta
+
+@router.get("/{profile_id}/folded")
+def download_profile(profile_id: str, current_user=Depends(admin_required)):
+    """
+    Collapsed stacks ("frame;frame;frame count" per line), ready for
+    flamegraph.pl or speedscope.
+    """
+    path = store.folded_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
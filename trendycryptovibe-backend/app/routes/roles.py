@@ -5,6 +5,7 @@ from app.models.role import Role
 from app.models.user import User
 from app.auth.jwt_handler import get_current_user
 from app.auth.permissions import admin_required
+from app.core.audit import audit
 
 router = APIRouter(prefix="/roles", tags=["Roles"])
 
@@ -53,4 +54,5 @@ def assign_role_to_user(
 
     user.roles.append(role)
     db.commit()
+    audit("role.assigned", current_user.id, user_id, f"role:{role_name}")
     return {"message": f"Role '{role_name}' assigned to user ID {user_id} successfully"}
\ No newline at end of file
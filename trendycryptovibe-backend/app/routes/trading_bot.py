@@ -1,9 +1,19 @@
-from fastapi import APIRouter, Body
-from typing import List, Dict, Any
-from app.ai.trading_bot import TradingBot
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from typing import List, Dict, Any, Optional
+from app.core.serialization import wants_binary, binary_response, downsample
+from app.auth.permissions import admin_required
 
 router = APIRouter(prefix="/bot", tags=["TradingBot"])
-bot = TradingBot(ma_short=5, ma_long=20)
+_bot = None
+
+
+def get_bot():
+    # analytics stack is imported on first use, not at worker startup
+    global _bot
+    if _bot is None:
+        from app.ai.trading_bot import TradingBot
+        _bot = TradingBot(ma_short=5, ma_long=20)
+    return _bot
 
 
 @router.post("/signal")
@@ -20,12 +30,12 @@ def get_signal(prices: Dict[str, List[float]] = Body(...)):
     if not isinstance(prices_list, list) or len(prices_list) == 0:
         return {"error": "Provide a non-empty list under 'prices'."}
 
-    out = bot.combined_signal(prices_list)
+    out = get_bot().combined_signal(prices_list)
     return out
 
 
 @router.post("/backtest")
-def run_backtest(payload: Dict[str, Any] = Body(...)):
+def run_backtest(request: Request, payload: Dict[str, Any] = Body(...)):
     """
     Expect:
     {
@@ -33,6 +43,7 @@ def run_backtest(payload: Dict[str, Any] = Body(...)):
       "initial_capital": 1000,
       "fee_pct": 0.001
     }
+    Send `Accept: application/x-columnar` for the binary columnar format.
     """
     prices = payload.get("prices", [])
     initial_capital = float(payload.get("initial_capital", 1000.0))
@@ -43,14 +54,128 @@ def run_backtest(payload: Dict[str, Any] = Body(...)):
         return {"error": "Provide a non-empty list under 'prices'."}
 
     # Run backtest from the bot class
-    result = bot.backtest(
+    result = get_bot().backtest(
         prices=prices,
         initial_capital=initial_capital,
         fee_pct=fee_pct,
     )
 
+    if wants_binary(request):
+        header = {"initial_capital": initial_capital, "fee_pct": fee_pct,
+                  **{k: v for k, v in result.items() if k != "trades"}}
+        return binary_response(header, _trade_columns(result["trades"]))
+
     return {
         "initial_capital": initial_capital,
         "fee_pct": fee_pct,
         "result": result
     }
+
+
+@router.post("/backtest/quant")
+def run_quant_backtest(request: Request, payload: Dict[str, Any] = Body(...)):
+    """
+    Indicator-based backtest (MA crossover + RSI filter) with equity curve.
+    Expect:
+    {
+      "prices": [...],
+      "initial_capital": 1000,
+      "fee_pct": 0.001,
+      "stop_loss": 0.05,       # optional
+      "take_profit": 0.1,      # optional
+      "fixed_size": 0.5,       # optional
+      "max_points": 500        # optional, downsample the equity curve
+    }
+    Send `Accept: application/x-columnar` for the binary columnar format.
+    """
+    import pandas as pd
+    from app.ai.quant_engine import QuantEngine
+
+    prices = payload.get("prices", [])
+    if not isinstance(prices, list) or len(prices) == 0:
+        return {"error": "Provide a non-empty list under 'prices'."}
+
+    engine = QuantEngine(fee_pct=float(payload.get("fee_pct", 0.001)))
+    result = engine.backtest_df(
+        pd.DataFrame({"close": prices}),
+        initial_capital=float(payload.get("initial_capital", 1000.0)),
+        stop_loss=payload.get("stop_loss"),
+        take_profit=payload.get("take_profit"),
+        fixed_size=payload.get("fixed_size"),
+    )
+
+    index, equity = downsample(result.pop("equity_curve"), int(payload.get("max_points") or 0))
+    trades = result.pop("trades")
+
+    if wants_binary(request):
+        result.pop("trade_pnls")
+        columns = [("equity_index", "i4", index), ("equity", "f8", equity), *_trade_columns(trades)]
+        return binary_response(result, columns)
+
+    return {**result, "equity_index": index, "equity_curve": equity, "trades": trades}
+
+
+def _trade_columns(trades):
+    return [
+        ("trade_type", "i1", [1 if t["type"] == "buy" else -1 for t in trades]),
+        ("trade_index", "i4", [t["index"] for t in trades]),
+        ("trade_price", "f8", [t["price"] for t in trades]),
+        ("trade_position", "f8", [t["position"] for t in trades]),
+    ]
+
+
+def _scanner():
+    from app.services.scanner import scanner
+    # the scheduler may run in another worker; follow its snapshot file
+    scanner.reload_if_changed()
+    return scanner
+
+
+@router.get("/scan")
+def get_scan(
+    signal: Optional[str] = None,
+    quant_signal: Optional[str] = None,
+    rsi_lt: Optional[float] = None,
+    rsi_gt: Optional[float] = None,
+    min_score: Optional[float] = None,
+    symbols: Optional[str] = None,
+    sort: str = "-score",
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Precomputed signals for the scanned universe, e.g.
+    /bot/scan?signal=buy&rsi_lt=40&sort=rsi
+    Results come from the last scheduled scan; nothing is computed here.
+    """
+    filters = {}
+    if signal:
+        filters["signal"] = signal.lower()
+    if quant_signal:
+        filters["quant_signal"] = quant_signal.lower()
+    if rsi_lt is not None:
+        filters["rsi__lt"] = rsi_lt
+    if rsi_gt is not None:
+        filters["rsi__gt"] = rsi_gt
+    if min_score is not None:
+        filters["score__ge"] = min_score
+    if symbols:
+        filters["symbol__in"] = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+
+    scanner = _scanner()
+    table = scanner.table
+    try:
+        results = table.query(filters, sort, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"interval": table.interval, "scanned_at": table.scanned_at, "count": len(results), "results": results}
+
+
+@router.post("/scan/run")
+def run_scan(current_user=Depends(admin_required)):
+    scanner = _scanner()
+    if scanner.running:
+        raise HTTPException(status_code=409, detail="A scan is already running")
+    result = scanner.scan()
+    if result is None:
+        raise HTTPException(status_code=409, detail="A scan is already running")
+    return result
@@ -1,95 +1,367 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+import json
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import get_db, SessionLocal
+from app.db.pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.models.user import User
 from app.models.transactions import Transaction
+from app.models.schemas import TransactionPage, TransactionResponse, TransactionResult, BulkStatusUpdate
+from app.services.balances import apply_approved, available_balance
+from app.services.outbox import enqueue
+from app.services.versions import bump, bump_for_transactions, get_version
 from app.auth.jwt_handler import get_current_user
+from app.core.idempotency import idempotent
+from app.core.etag import make_etag, conditional_json
+from app.core.audit import audit, audit_log
 from app.auth.permissions import admin_required
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
+def _create_transaction(db: Session, user_id: int, tx_type: str, amount: float, currency: str, message: str):
+    # no commit here: idempotent() commits it together with the Idempotency-Key
+    new_transaction = Transaction(
+        user_id=user_id,
+        tx_type=tx_type,
+        amount=amount,
+        currency=currency,
+        status="pending"
+    )
+    db.add(new_transaction)
+    db.flush()
+    # validation, balances and notifications run later in the outbox worker
+    enqueue(db, "transaction.created", [new_transaction.id])
+    bump(db, "transactions", [user_id])
+    return {"message": message, "transaction": new_transaction}
+
+
+def _created(response: Response, result: dict, replayed: bool):
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+        return
+    tx = result["transaction"]
+    audit(f"transaction.{tx.tx_type}", tx.user_id, tx.user_id, f"transaction:{tx.id}",
+          amount=tx.amount, currency=tx.currency)
+
+
 # user creates deposit
-@router.get("/deposit")
+@router.post("/deposit", response_model=TransactionResult)
 def create_deposit(
     amount: float,
     currency: str,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    new_transaction = Transaction(
-        user_id=current_user.id,
-        type="deposit",
-        amount=amount,
-        currency=currency,
-        status="pending"
+    if amount <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be positive")
+
+    # a retried key replays the stored response without touching transactions
+    result, replayed = idempotent(
+        db, current_user.id, idempotency_key, f"deposit:{amount}:{currency}",
+        lambda: _create_transaction(db, current_user.id, "deposit", amount, currency, "Deposit created"),
     )
-    db.add(new_transaction)
-    db.commit()
-    db.refresh(new_transaction)
-    return {"message": "Deposit created", "transaction": new_transaction}
+    _created(response, result, replayed)
+    return result
 
-    # user request withdrawal
-@router.post("/withdraw")
+# user request withdrawal
+@router.post("/withdraw", response_model=TransactionResult)
 def create_withdrawal(
     amount: float,
     currency: str,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    new_transaction = Transaction(
-        user_id=current_user.id,
-        type="withdrawal",
-        amount=amount,
-        currency=currency,
-        status="pending"
-    )
-    db.add(new_transaction)
-    db.commit()
-    db.refresh(new_transaction)
-    return {"message": "Withdrawal request created", "transaction": new_transaction}    
+    if amount <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be positive")
+
+    def create():
+        # materialized balance minus what earlier pending withdrawals already hold
+        if available_balance(db, current_user.id, currency) < amount:
+            raise HTTPException(status_code=400, detail="Insufficient balance")
+        return _create_transaction(db, current_user.id, "withdrawal", amount, currency, "Withdrawal request created")
+
+    result, replayed = idempotent(db, current_user.id, idempotency_key, f"withdrawal:{amount}:{currency}", create)
+    _created(response, result, replayed)
+    return result
+
+def _filtered(query, status: Optional[str], tx_type: Optional[str]):
+    if status:
+        query = query.filter(Transaction.status == status)
+    if tx_type:
+        query = query.filter(Transaction.tx_type == tx_type)
+    return query
 
-# user can view own transactions
-@router.get("/my")
-def get_my_transactions(db: Session = Depends(get_db),
+
+# user can view own transactions (newest first, paginated by cursor)
+@router.get("/my", response_model=TransactionPage)
+def get_my_transactions(request: Request,
+                        cursor: Optional[str] = None,
+                        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                        status: Optional[str] = None,
+                        tx_type: Optional[str] = None,
+                        db: Session = Depends(get_db),
                         current_user: User = Depends(get_current_user)):
-    txs = db.query(Transaction).filter(Transaction.user_id == current_user.id).all()
-    return txns
+    etag = make_etag("transactions", current_user.id, get_version(db, current_user.id, "transactions"), request)
+
+    def build():
+        query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+        query = _filtered(query, status, tx_type)
+        txs, next_cursor = keyset_page(query, Transaction.timestamp, Transaction.id, cursor, limit)
+        # conditional_json returns a raw Response, so response_model is applied here
+        return TransactionPage(items=[TransactionResponse.from_orm(t) for t in txs], next_cursor=next_cursor)
+
+    return conditional_json(request, etag, build)
+
+def _set_status(db: Session, tx_id: int, new_status: str):
+    # conditional update: only a pending transaction can change state
+    changed = db.query(Transaction).filter(
+        Transaction.id == tx_id, Transaction.status == "pending"
+    ).update({"status": new_status}, synchronize_session=False)
+    if not changed:
+        db.rollback()
+        if not db.query(Transaction.id).filter(Transaction.id == tx_id).first():
+            raise HTTPException(status_code=404, detail="Transaction not found")
+        raise HTTPException(status_code=400, detail="Transaction already processed")
+
 
 # ADMIN — approve transaction
-@router.post("/approve/{tx_id}")
+@router.post("/approve/{tx_id}", response_model=TransactionResult)
 def approve_transaction(tx_id: int,
                         db: Session = Depends(get_db),
                         current_user: User = Depends(admin_required)):
 
-    tx = db.query(Transaction).filter(Transaction.id == tx_id).first()
-    if not tx:
-        raise HTTPException(status_code=404, detail="Transaction not found")
-
-    tx.status = "approved"
+    _set_status(db, tx_id, "approved")
+    # ledger and balances commit atomically with the status change
+    if apply_approved(db, [tx_id]):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Insufficient balance")
+    enqueue(db, "transaction.approved", [tx_id])
+    bump_for_transactions(db, [tx_id])
     db.commit()
 
+    tx = db.query(Transaction).filter(Transaction.id == tx_id).first()
+    audit("transaction.approved", current_user.id, tx.user_id, f"transaction:{tx_id}",
+          amount=tx.amount, currency=tx.currency)
     return {"message": "Transaction approved", "transaction": tx}
 
 
 # ADMIN — reject transaction
-@router.post("/reject/{tx_id}")
+@router.post("/reject/{tx_id}", response_model=TransactionResult)
 def reject_transaction(tx_id: int,
                        db: Session = Depends(get_db),
                        current_user: User = Depends(admin_required)):
 
-    tx = db.query(Transaction).filter(Transaction.id == tx_id).first()
-    if not tx:
-        raise HTTPException(status_code=404, detail="Transaction not found")
-
-    tx.status = "rejected"
+    _set_status(db, tx_id, "rejected")
+    enqueue(db, "transaction.rejected", [tx_id])
+    bump_for_transactions(db, [tx_id])
     db.commit()
 
+    tx = db.query(Transaction).filter(Transaction.id == tx_id).first()
+    audit("transaction.rejected", current_user.id, tx.user_id, f"transaction:{tx_id}",
+          amount=tx.amount, currency=tx.currency)
     return {"message": "Transaction rejected", "transaction": tx}
 
 
-# ADMIN — list all transactions
-@router.get("/all")
-def get_all_transactions(db: Session = Depends(get_db),
+BULK_CHUNK_SIZE = 500
+MAX_BULK_IDS = 50000
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _audit_bulk(db: Session, actor_id: int, tx_ids, new_status: str):
+    # one record per transaction so each owner's trail is complete; queued in one call
+    audit_log.record_many(
+        (f"transaction.{new_status}", actor_id, user_id, f"transaction:{tx_id}",
+         {"amount": amount, "currency": currency, "bulk": True})
+        for chunk in _chunks(tx_ids, BULK_CHUNK_SIZE)
+        for tx_id, user_id, amount, currency in db.query(
+            Transaction.id, Transaction.user_id, Transaction.amount, Transaction.currency
+        ).filter(Transaction.id.in_(chunk))
+    )
+
+
+def _update_locked(db: Session, base, conditions: list) -> List[int]:
+    # no RETURNING: lock the matching rows first, so the ids read are the rows the UPDATE changes
+    ids = [r.id for r in db.query(Transaction.id).filter(*conditions).with_for_update()]
+    changed = 0
+    for chunk in _chunks(ids, BULK_CHUNK_SIZE):
+        changed += db.execute(base.where(Transaction.id.in_(chunk))).rowcount
+    if changed != len(ids):
+        raise HTTPException(status_code=409, detail="Transactions changed during the update, retry")
+    return ids
+
+
+def _bulk_set_status(db: Session, payload: BulkStatusUpdate, new_status: str, actor_id: int):
+    """
+    Move pending transactions to new_status with set-based UPDATEs in one
+    database transaction. The `status = 'pending'` guard makes a row change
+    at most once even when two admins race on the same queue.
+    """
+    if payload.ids is None and payload.user_id is None and payload.tx_type is None and payload.before is None:
+        raise HTTPException(status_code=400, detail="Provide ids or at least one filter")
+    if payload.ids is not None and len(payload.ids) > MAX_BULK_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_IDS} ids per request")
+
+    conditions = [Transaction.status == "pending"]
+    if payload.user_id is not None:
+        conditions.append(Transaction.user_id == payload.user_id)
+    if payload.tx_type is not None:
+        conditions.append(Transaction.tx_type == payload.tx_type)
+    if payload.before is not None:
+        conditions.append(Transaction.timestamp < payload.before)
+    base = update(Transaction).where(*conditions).values(status=new_status)
+
+    can_return = db.get_bind().dialect.update_returning
+    updated = []
+    try:
+        if payload.ids is None:
+            if can_return:
+                updated = list(db.execute(base.returning(Transaction.id)).scalars())
+            else:
+                updated = _update_locked(db, base, conditions)
+        else:
+            ids = list(dict.fromkeys(payload.ids))
+            for chunk in _chunks(ids, BULK_CHUNK_SIZE):
+                stmt = base.where(Transaction.id.in_(chunk))
+                if can_return:
+                    updated.extend(db.execute(stmt.returning(Transaction.id)).scalars())
+                else:
+                    updated.extend(_update_locked(db, base, [Transaction.id.in_(chunk), *conditions]))
+        short = []
+        if new_status == "approved":
+            # withdrawals the balance no longer covers go back to pending
+            short = apply_approved(db, updated)
+            for chunk in _chunks(short, BULK_CHUNK_SIZE):
+                db.execute(update(Transaction).where(Transaction.id.in_(chunk)).values(status="pending"))
+            unfunded = set(short)
+            updated = [i for i in updated if i not in unfunded]
+        enqueue(db, f"transaction.{new_status}", updated)
+        bump_for_transactions(db, updated)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    _audit_bulk(db, actor_id, updated, new_status)
+
+    result = {"updated": sorted(updated), "insufficient_balance": sorted(short),
+              "not_found": [], "already_processed": []}
+    if payload.ids is not None:
+        done = set(updated) | set(short)
+        rest = [i for i in dict.fromkeys(payload.ids) if i not in done]
+        existing = set()
+        for chunk in _chunks(rest, BULK_CHUNK_SIZE):
+            existing.update(r.id for r in db.query(Transaction.id).filter(Transaction.id.in_(chunk)))
+        result["not_found"] = [i for i in rest if i not in existing]
+        result["already_processed"] = [i for i in rest if i in existing]
+    return result
+
+
+# ADMIN — approve many pending transactions at once
+@router.post("/bulk/approve")
+def bulk_approve_transactions(payload: BulkStatusUpdate,
+                              db: Session = Depends(get_db),
+                              current_user: User = Depends(admin_required)):
+
+    return _bulk_set_status(db, payload, "approved", current_user.id)
+
+
+# ADMIN — reject many pending transactions at once
+@router.post("/bulk/reject")
+def bulk_reject_transactions(payload: BulkStatusUpdate,
+                             db: Session = Depends(get_db),
+                             current_user: User = Depends(admin_required)):
+
+    return _bulk_set_status(db, payload, "rejected", current_user.id)
+
+
+# ADMIN — list all transactions (newest first, paginated by cursor)
+@router.get("/all", response_model=TransactionPage)
+def get_all_transactions(cursor: Optional[str] = None,
+                         limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                         status: Optional[str] = None,
+                         tx_type: Optional[str] = None,
+                         db: Session = Depends(get_db),
                          current_user: User = Depends(admin_required)):
 
-    return db.query(Transaction).all()
\ No newline at end of file
+    query = _filtered(db.query(Transaction), status, tx_type)
+    txs, next_cursor = keyset_page(query, Transaction.timestamp, Transaction.id, cursor, limit)
+    return {"items": txs, "next_cursor": next_cursor}
+
+
+EXPORT_COLUMNS = ("id", "user_id", "tx_type", "currency", "amount", "status", "timestamp")
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_rows(fmt: str, start: Optional[datetime], end: Optional[datetime],
+                 status: Optional[str], tx_type: Optional[str]):
+    """
+    Stream plain column tuples through a server-side cursor, one text chunk
+    per batch, so memory stays flat regardless of table size.
+    The session is owned by the generator because it outlives the request handler.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(*[getattr(Transaction, c) for c in EXPORT_COLUMNS])
+        query = _filtered(query, status, tx_type)
+        if start:
+            query = query.filter(Transaction.timestamp >= start)
+        if end:
+            query = query.filter(Transaction.timestamp < end)
+        query = query.order_by(Transaction.id).execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE)
+
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == "csv":
+            writer.writerow(EXPORT_COLUMNS)
+
+        pending = 0
+        for row in query:
+            values = list(row)
+            if values[-1] is not None:
+                values[-1] = values[-1].isoformat()
+            if fmt == "csv":
+                writer.writerow(values)
+            else:
+                buf.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))))
+                buf.write("\n")
+            pending += 1
+            if pending >= EXPORT_BATCH_SIZE:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+                pending = 0
+
+        if buf.tell():
+            yield buf.getvalue()
+    finally:
+        db.close()
+
+
+# ADMIN — stream every matching transaction as NDJSON or CSV
+@router.get("/export")
+def export_transactions(format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                        start: Optional[datetime] = None,
+                        end: Optional[datetime] = None,
+                        status: Optional[str] = None,
+                        tx_type: Optional[str] = None,
+                        current_user: User = Depends(admin_required)):
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"transactions.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        _export_rows(format, start, end, status, tx_type),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
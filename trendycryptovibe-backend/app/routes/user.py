@@ -1,50 +1,47 @@
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.models.user import User
-from app.models.profile import Profile
-from app.models.wallets import Wallet
-from app.models.schemas import UserCreate, UserLogin, UserResponse
+from app.models.schemas import UserCreate, UserLogin, UserResponse, UserImport
 from app.auth.hash import hash_password, verify_password
 from app.auth.jwt_handler import create_access_token
-import uuid
+from app.auth.permissions import admin_required
+from app.services.accounts import create_account, bulk_import_users
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-def generate_wallet_address(prefix="WALLET"):
-    return f"{prefix}_{uuid.uuid4().hex[:32]}"
+# admin is only ever granted through /roles/assign
+DEFAULT_ROLES = ["user"]
+MAX_IMPORT_USERS = 10000
 
 @router.post("/register", response_model=UserResponse)
 def register_user(data: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == data.email).first()
+    existing_user = db.query(User.id).filter(User.email == data.email).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    new_user = User(email=data.email, password=hash_password(data.password))
-    db.add(new_user)
+    # user, profile, roles and wallets go in as one transaction
+    new_user = create_account(
+        db,
+        email=data.email,
+        password_hash=hash_password(data.password),
+        username=data.email.split("@")[0],
+        roles=DEFAULT_ROLES,
+    )
     db.commit()
-    db.refresh(new_user)
-
-    profile = Profile(user_id=new_user.id, username=data.email.split("@")[0])
-    db.add(profile)
-    admin_role = db.query(Role).filter(Role.name == "admin").first()
-    new_user.roles.append(admin_role)
-    default_role = db.query(Role).filter(Role.name == "user").first()
-    new_user.roles.append(default_role)
-
+    return new_user
 
 
-    networks = ["BTC", "ETH", "BSC", "TRON"]
-    for net in networks:
-        wallet = Wallet(
-            user_id=new_user.id,
-            network=net,
-            address=generate_wallet_address(net)
-        )
-        db.add(wallet)
+# ADMIN — migrate accounts in bulk (batched executemany inserts)
+@router.post("/import")
+def import_users(users: List[UserImport],
+                 db: Session = Depends(get_db),
+                 current_user=Depends(admin_required)):
+    if len(users) > MAX_IMPORT_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IMPORT_USERS} users per request")
 
-    db.commit()
-    return new_user
+    return bulk_import_users(db, (u.dict() for u in users), actor_id=current_user.id)
 
 
 @router.post("/login")
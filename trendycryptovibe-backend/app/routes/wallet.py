@@ -1,15 +1,39 @@
-from fastapi import APIRouter, Depends
+from typing import List
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.auth.jwt_handler import get_current_user
 from app.models.wallets import Wallet
+from app.models.balances import Balance
+from app.models.schemas import BalanceResponse
+from app.core.etag import make_etag, conditional_json
+from app.services.versions import get_version
 
 router = APIRouter(prefix="/wallets", tags=["Wallets"])
 
 @router.get("/")
 def get_user_wallets(
+    request: Request,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    wallets = db.query(Wallet).filter(Wallet.user_id == current_user.id).all()
-    return wallets
+    # polling clients get a 304 after a single counter lookup
+    etag = make_etag("wallets", current_user.id, get_version(db, current_user.id, "wallets"), request)
+    return conditional_json(
+        request, etag,
+        lambda: db.query(Wallet).filter(Wallet.user_id == current_user.id).all(),
+    )
+
+
+@router.get("/balances", response_model=List[BalanceResponse])
+def get_user_balances(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    # materialized per-currency balances; their counter is bumped wherever a balance row changes
+    etag = make_etag("balances", current_user.id, get_version(db, current_user.id, "balances"), request)
+    # conditional_json returns a raw Response, so response_model is applied here
+    return conditional_json(request, etag, lambda: [
+        BalanceResponse.from_orm(b) for b in db.query(Balance).filter(Balance.user_id == current_user.id)
+    ])
@@ -0,0 +1,234 @@
+import csv
+import json
+import re
+import sys
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.user import User
+from app.models.profile import Profile
+from app.models.role import Role
+from app.models.wallets import Wallet
+from app.models.user_role import user_roles
+from app.auth.hash import hash_password
+from app.core.audit import audit_log
+from app.services.versions import bump
+
+WALLET_NETWORKS = ["BTC", "ETH", "BSC", "TRON"]
+IMPORT_BATCH_SIZE = 1000
+# passlib's bcrypt: $2a$/$2b$/$2y$, two-digit cost, 53 chars of salt and digest
+BCRYPT_HASH = re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+# role name -> id; roles are only ever added, so a cached id never goes stale
+_role_ids: Dict[str, int] = {}
+
+
+def generate_wallet_address(prefix="WALLET"):
+    return f"{prefix}_{uuid.uuid4().hex[:32]}"
+
+
+def role_ids(db: Session, names: Iterable[str]) -> List[int]:
+    names = list(dict.fromkeys(names))
+    missing = [n for n in names if n not in _role_ids]
+    if missing:
+        for role_id, name in db.query(Role.id, Role.name).filter(Role.name.in_(missing)):
+            _role_ids[name] = role_id
+    return [_role_ids[n] for n in names if n in _role_ids]
+
+
+def seed_roles(db: Session, names: Iterable[str]):
+    """
+    Insert any missing roles in one statement and warm the role id cache.
+    """
+    rows = [{"name": n} for n in names]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        db.execute(dialect_insert(Role).on_conflict_do_nothing(index_elements=["name"]), rows)
+    else:
+        existing = {n for (n,) in db.query(Role.name).filter(Role.name.in_([r["name"] for r in rows]))}
+        missing = [r for r in rows if r["name"] not in existing]
+        if missing:
+            db.execute(insert(Role), missing)
+    db.commit()
+    role_ids(db, names)
+
+
+def wallet_rows(user_id: int) -> List[dict]:
+    return [
+        {"user_id": user_id, "network": net, "address": generate_wallet_address(net)}
+        for net in WALLET_NETWORKS
+    ]
+
+
+def create_account(db: Session, email: str, password_hash: str, username: str, roles: Iterable[str]) -> User:
+    """
+    Insert a user with profile, roles and wallets without committing.
+    One flush for the user id, then one executemany per child table,
+    so the caller's single commit covers the whole signup.
+    """
+    user = User(email=email, password=password_hash)
+    db.add(user)
+    db.flush()
+
+    db.execute(insert(Profile), [{"user_id": user.id, "username": username}])
+    ids = role_ids(db, roles)
+    if ids:
+        db.execute(insert(user_roles), [{"user_id": user.id, "role_id": r} for r in ids])
+    db.execute(insert(Wallet), wallet_rows(user.id))
+    bump(db, "wallets", [user.id])
+    return user
+
+
+def _reject(result: dict, rec: dict, reason: str):
+    result["rejected"].append({"email": rec.get("email"), "reason": reason})
+
+
+def _import_batch(db: Session, records: List[dict], result: dict, grants: List[Tuple[int, str]]):
+    # accounts that could never log in are reported instead of created
+    valid = []
+    for rec in records:
+        if rec.get("password_hash"):
+            if not BCRYPT_HASH.match(rec["password_hash"]):
+                _reject(result, rec, "password_hash is not a bcrypt hash")
+                continue
+        elif not rec.get("password"):
+            _reject(result, rec, "password or password_hash required")
+            continue
+        valid.append(rec)
+
+    # drop duplicates inside the batch and emails that already exist
+    by_email = {}
+    for rec in valid:
+        by_email.setdefault(rec["email"], rec)
+    existing = {e for (e,) in db.query(User.email).filter(User.email.in_(list(by_email)))}
+    fresh = [rec for email, rec in by_email.items() if email not in existing]
+    result["skipped"] += len(valid) - len(fresh)
+
+    # phone numbers are unique too; a clash with the batch or the table rejects the row
+    phones = [rec["phone_number"] for rec in fresh if rec.get("phone_number")]
+    taken_phones = {p for (p,) in db.query(Profile.phone_number).filter(Profile.phone_number.in_(phones))} if phones else set()
+    unique = []
+    for rec in fresh:
+        phone = rec.get("phone_number")
+        if phone:
+            if phone in taken_phones:
+                _reject(result, rec, "phone_number already in use")
+                continue
+            taken_phones.add(phone)
+        unique.append(rec)
+    fresh = unique
+    if not fresh:
+        return
+
+    user_rows = []
+    for rec in fresh:
+        password_hash = rec.get("password_hash") or hash_password(rec["password"])
+        user_rows.append({"email": rec["email"], "password": password_hash})
+    db.execute(insert(User), user_rows)
+
+    emails = [rec["email"] for rec in fresh]
+    id_by_email = dict(db.query(User.email, User.id).filter(User.email.in_(emails)))
+
+    # usernames are unique; fall back to "<name>_<user id>" on a clash
+    wanted = {rec["email"]: rec.get("username") or rec["email"].split("@")[0] for rec in fresh}
+    taken = {u for (u,) in db.query(Profile.username).filter(Profile.username.in_(list(wanted.values())))}
+
+    profile_rows, role_rows, wallet_batch = [], [], []
+    for rec in fresh:
+        user_id = id_by_email[rec["email"]]
+        username = wanted[rec["email"]]
+        if username in taken:
+            username = f"{username}_{user_id}"
+        taken.add(username)
+        profile_rows.append({
+            "user_id": user_id,
+            "username": username,
+            "phone_number": rec.get("phone_number"),
+            "bio": rec.get("bio"),
+        })
+        names = rec.get("roles") or ["user"]
+        role_ids(db, names)
+        # unknown role names are ignored, as in role_ids()
+        for name in dict.fromkeys(n for n in names if n in _role_ids):
+            role_rows.append({"user_id": user_id, "role_id": _role_ids[name]})
+            grants.append((user_id, name))
+        wallet_batch.extend(wallet_rows(user_id))
+
+    db.execute(insert(Profile), profile_rows)
+    if role_rows:
+        db.execute(insert(user_roles), role_rows)
+    db.execute(insert(Wallet), wallet_batch)
+    bump(db, "wallets", id_by_email.values())
+    result["created"] += len(fresh)
+
+
+def bulk_import_users(db: Session, records: Iterable[dict], batch_size: int = IMPORT_BATCH_SIZE,
+                      actor_id: Optional[int] = None) -> dict:
+    """
+    Load users with profiles, role links and wallets using executemany
+    inserts, committing once per batch.
+    Records: {"email", "password" or "password_hash", optional "username",
+    "phone_number", "bio", "roles"}. Passing bcrypt hashes from the old
+    platform skips the (slow) per-user hashing. Existing emails are
+    skipped; rows with a malformed hash or a phone number already in use
+    are listed under "rejected" and the rest of the batch still goes in.
+    Every role granted is audited as "role.assigned" by actor_id once its
+    batch has committed, like /roles/assign.
+    """
+    result = {"created": 0, "skipped": 0, "rejected": []}
+    batch = []
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= batch_size:
+            _commit_batch(db, batch, result, actor_id)
+            batch = []
+    if batch:
+        _commit_batch(db, batch, result, actor_id)
+    return result
+
+
+def _commit_batch(db: Session, batch: List[dict], result: dict, actor_id: Optional[int] = None):
+    before = dict(result, rejected=list(result["rejected"]))
+    grants = []
+    try:
+        _import_batch(db, batch, result, grants)
+        db.commit()
+        audit_log.record_many(("role.assigned", actor_id, user_id, f"role:{name}", {}) for user_id, name in grants)
+    except IntegrityError:
+        # a conflict the pre-checks missed (e.g. a concurrent signup): redo the batch row by row
+        db.rollback()
+        result.clear()
+        result.update(before)
+        if len(batch) == 1:
+            _reject(result, batch[0], "conflicts with an existing account")
+            return
+        for rec in batch:
+            _commit_batch(db, [rec], result, actor_id)
+
+
+def _read_records(path: str):
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                if row.get("roles"):
+                    row["roles"] = row["roles"].split(";")
+                yield {k: v for k, v in row.items() if v}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+if __name__ == "__main__":
+    # usage: python -m app.services.accounts users.jsonl|users.csv
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(bulk_import_users(db, _read_records(sys.argv[1])))
+    finally:
+        db.close()
@@ -0,0 +1,181 @@
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import case, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.balances import Balance, LedgerEntry
+from app.models.transactions import Transaction
+from app.services.versions import bump
+
+CHUNK_SIZE = 500
+RECONCILE_BATCH_SIZE = 500
+TOLERANCE = 1e-9
+
+# sign applied to the user's account for each transaction type
+TX_SIGN = {"deposit": 1.0, "withdrawal": -1.0}
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def get_balance(db: Session, user_id: int, currency: str) -> float:
+    row = db.query(Balance.amount).filter(Balance.user_id == user_id, Balance.currency == currency).first()
+    return row.amount if row else 0.0
+
+
+def available_balance(db: Session, user_id: int, currency: str) -> float:
+    # pending withdrawals are holds on the balance until they are approved or rejected
+    held = db.query(func.sum(Transaction.amount)).filter(
+        Transaction.user_id == user_id, Transaction.currency == currency,
+        Transaction.tx_type == "withdrawal", Transaction.status == "pending",
+    ).scalar()
+    return get_balance(db, user_id, currency) - (held or 0.0)
+
+
+def _upsert_balances(db: Session, deltas: Dict[Tuple[int, str], float]):
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "currency": currency, "amount": delta, "updated_at": now}
+        for (user_id, currency), delta in deltas.items()
+    ]
+    if not rows:
+        return
+    # every path that moves a balance comes through here or _debit, reconcile included
+    bump(db, "balances", [user_id for user_id, _ in deltas])
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(Balance)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "currency"],
+            set_={"amount": Balance.amount + stmt.excluded.amount, "updated_at": stmt.excluded.updated_at},
+        )
+        db.execute(stmt, rows)
+        return
+
+    for row in rows:
+        updated = db.query(Balance).filter(
+            Balance.user_id == row["user_id"], Balance.currency == row["currency"]
+        ).update({"amount": Balance.amount + row["amount"], "updated_at": now}, synchronize_session=False)
+        if not updated:
+            db.execute(insert(Balance), [row])
+
+
+def _debit(db: Session, user_id: int, currency: str, amount: float) -> bool:
+    # conditional on the funds being there at commit time, whatever was checked at request time
+    changed = db.query(Balance).filter(
+        Balance.user_id == user_id, Balance.currency == currency, Balance.amount >= amount - TOLERANCE
+    ).update({"amount": Balance.amount - amount, "updated_at": datetime.utcnow()}, synchronize_session=False)
+    if changed:
+        bump(db, "balances", [user_id])
+    return bool(changed)
+
+
+def apply_approved(db: Session, tx_ids: Iterable[int]) -> List[int]:
+    """
+    Write ledger entries and bump materialized balances for transactions that
+    were just moved to 'approved'. Runs inside the caller's transaction so the
+    status change, journal and balances commit (or roll back) together.
+    Withdrawals are debited one by one, oldest first, only while the balance
+    covers them; the ids that did not fit are returned untouched and the
+    caller must not commit them as approved.
+    """
+    tx_ids = list(tx_ids)
+    entries: List[dict] = []
+    deltas: Dict[Tuple[int, str], float] = defaultdict(float)
+    insufficient: List[int] = []
+
+    for chunk in _chunks(tx_ids, CHUNK_SIZE):
+        rows = db.query(
+            Transaction.id, Transaction.user_id, Transaction.currency, Transaction.tx_type, Transaction.amount
+        ).filter(Transaction.id.in_(chunk)).order_by(Transaction.id)
+        for tx_id, user_id, currency, tx_type, amount in rows:
+            signed = TX_SIGN.get(tx_type, 0.0) * amount
+            if not signed:
+                continue
+            if signed < 0:
+                if not _debit(db, user_id, currency, -signed):
+                    insufficient.append(tx_id)
+                    continue
+            else:
+                deltas[(user_id, currency)] += signed
+            entries.append({"transaction_id": tx_id, "user_id": user_id, "account": "user",
+                            "currency": currency, "amount": signed})
+            entries.append({"transaction_id": tx_id, "user_id": user_id, "account": "external",
+                            "currency": currency, "amount": -signed})
+
+    if entries:
+        db.execute(insert(LedgerEntry), entries)
+    _upsert_balances(db, deltas)
+    return insufficient
+
+
+def _expected_balances(db: Session, user_ids: List[int]) -> Dict[Tuple[int, str], float]:
+    signed = case(
+        (Transaction.tx_type == "deposit", Transaction.amount),
+        (Transaction.tx_type == "withdrawal", -Transaction.amount),
+        else_=0.0,
+    )
+    rows = db.query(Transaction.user_id, Transaction.currency, func.sum(signed)).filter(
+        Transaction.user_id.in_(user_ids), Transaction.status == "approved"
+    ).group_by(Transaction.user_id, Transaction.currency)
+    return {(user_id, currency): total or 0.0 for user_id, currency, total in rows}
+
+
+def reconcile(db: Session, batch_size: int = RECONCILE_BATCH_SIZE, fix: bool = False) -> dict:
+    """
+    Compare materialized balances with sums over approved transactions,
+    walking users in keyset batches so memory stays bounded.
+    With fix=True mismatched balances are overwritten with the recomputed value.
+    """
+    mismatches = []
+    checked = 0
+    last_user_id = 0
+    while True:
+        user_ids = [u for (u,) in db.query(Transaction.user_id).filter(
+            Transaction.user_id > last_user_id
+        ).distinct().order_by(Transaction.user_id).limit(batch_size)]
+        extra = [u for (u,) in db.query(Balance.user_id).filter(
+            Balance.user_id > last_user_id
+        ).distinct().order_by(Balance.user_id).limit(batch_size)]
+        user_ids = sorted(set(user_ids) | set(extra))[:batch_size]
+        if not user_ids:
+            break
+
+        expected = _expected_balances(db, user_ids)
+        actual = {
+            (b.user_id, b.currency): b.amount
+            for b in db.query(Balance.user_id, Balance.currency, Balance.amount).filter(Balance.user_id.in_(user_ids))
+        }
+        for key in expected.keys() | actual.keys():
+            want, have = expected.get(key, 0.0), actual.get(key, 0.0)
+            checked += 1
+            if abs(want - have) > TOLERANCE:
+                mismatches.append({"user_id": key[0], "currency": key[1], "expected": want, "actual": have})
+                if fix:
+                    _upsert_balances(db, {key: want - have})
+
+        if fix:
+            db.commit()
+        last_user_id = user_ids[-1]
+
+    return {"checked": checked, "mismatches": mismatches, "fixed": fix}
+
+
+if __name__ == "__main__":
+    # usage: python -m app.services.balances [--fix]
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        result = reconcile(db, fix="--fix" in sys.argv[1:])
+        print(f"checked {result['checked']} balances, {len(result['mismatches'])} mismatches")
+        for m in result["mismatches"]:
+            print(f"  user {m['user_id']} {m['currency']}: expected {m['expected']} actual {m['actual']}")
+    finally:
+        db.close()
@@ -0,0 +1,272 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+from app.models.outbox import OutboxEvent
+from app.models.transactions import Transaction
+from app.models.balances import Balance
+from app.services.balances import apply_approved
+from app.services.versions import bump_for_transactions
+from app.core.audit import audit_log
+from app.core.idempotency import purge_expired
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 2.0
+POLL_INTERVAL_SECONDS = 1.0
+# how often the worker deletes expired Idempotency-Keys
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "600"))
+# deposits up to this amount are approved by the worker; 0 keeps every deposit manual
+AUTO_APPROVE_DEPOSIT_LIMIT = float(os.getenv("AUTO_APPROVE_DEPOSIT_LIMIT", "0"))
+
+
+def enqueue(db: Session, event_type: str, aggregate_ids: Iterable[int], payloads: Iterable[dict] = None):
+    """
+    Add events to the caller's transaction; they become visible to the worker
+    only when that transaction commits.
+    """
+    aggregate_ids = list(aggregate_ids)
+    payloads = list(payloads) if payloads is not None else [None] * len(aggregate_ids)
+    now = datetime.utcnow()
+    rows = [
+        {"event_type": event_type, "aggregate_id": agg_id, "payload": payload,
+         "status": "pending", "attempts": 0, "available_at": now, "created_at": now}
+        for agg_id, payload in zip(aggregate_ids, payloads)
+    ]
+    if rows:
+        db.execute(insert(OutboxEvent), rows)
+
+
+# ---- notifications ----
+def log_notifier(messages: List[dict]):
+    for m in messages:
+        logger.info("notify user %s: transaction %s %s", m["user_id"], m["transaction_id"], m["status"])
+
+
+notifier: Callable[[List[dict]], None] = log_notifier
+
+
+def _notify(db: Session, tx_ids: List[int]):
+    if not tx_ids:
+        return
+    rows = db.query(Transaction.id, Transaction.user_id, Transaction.status).filter(Transaction.id.in_(tx_ids))
+    notifier([{"transaction_id": i, "user_id": u, "status": s} for i, u, s in rows])
+
+
+def _move_pending(db: Session, tx_ids: List[int], status: str) -> List[int]:
+    # only the rows this call actually changed, so nothing is applied twice
+    if not tx_ids:
+        return []
+    stmt = update(Transaction).where(Transaction.id.in_(tx_ids), Transaction.status == "pending").values(status=status)
+    if db.get_bind().dialect.update_returning:
+        return list(db.execute(stmt.returning(Transaction.id)).scalars())
+    # no RETURNING: lock the rows first so the ids read are the rows the UPDATE changes
+    pending = [r.id for r in db.query(Transaction.id).filter(
+        Transaction.id.in_(tx_ids), Transaction.status == "pending").with_for_update()]
+    if pending:
+        changed = db.execute(stmt.where(Transaction.id.in_(pending))).rowcount
+        if changed != len(pending):
+            # the batch rolls back and its events are retried
+            raise RuntimeError(f"expected to move {len(pending)} transactions to {status}, moved {changed}")
+    return pending
+
+
+def _audit_records(db: Session, tx_ids: List[int], status: str, reasons: Dict[int, str] = None) -> List[tuple]:
+    # actor None: the worker decided, not an admin
+    rows = db.query(Transaction.id, Transaction.user_id, Transaction.amount, Transaction.currency).filter(
+        Transaction.id.in_(tx_ids)) if tx_ids else []
+    return [
+        (f"transaction.{status}", None, user_id, f"transaction:{tx_id}",
+         {"amount": amount, "currency": currency, "auto": True,
+          **({"reason": reasons[tx_id]} if reasons and tx_id in reasons else {})})
+        for tx_id, user_id, amount, currency in rows
+    ]
+
+
+# ---- handlers: each takes every due event of its type in one call ----
+# a handler may return audit records; they are written once its batch has committed
+def handle_transaction_created(db: Session, events: List[OutboxEvent]) -> List[tuple]:
+    """
+    Validate new deposits/withdrawals in bulk, reject the invalid ones and
+    auto-approve small deposits. Every write is conditional on the row still
+    being pending, so replaying an event is harmless.
+    """
+    tx_ids = [e.aggregate_id for e in events]
+    txs = db.query(
+        Transaction.id, Transaction.user_id, Transaction.currency, Transaction.tx_type, Transaction.amount
+    ).filter(Transaction.id.in_(tx_ids), Transaction.status == "pending").order_by(Transaction.id).all()
+    if not txs:
+        return []
+
+    # funds available for withdrawals: balance minus earlier pending withdrawals
+    keys = {(t.user_id, t.currency) for t in txs if t.tx_type == "withdrawal"}
+    available: Dict = defaultdict(float)
+    if keys:
+        user_ids = list({k[0] for k in keys})
+        for user_id, currency, amount in db.query(Balance.user_id, Balance.currency, Balance.amount).filter(
+                Balance.user_id.in_(user_ids)):
+            available[(user_id, currency)] += amount
+        for user_id, currency, held in db.query(
+                Transaction.user_id, Transaction.currency, func.sum(Transaction.amount)).filter(
+                Transaction.user_id.in_(user_ids), Transaction.tx_type == "withdrawal",
+                Transaction.status == "pending", Transaction.id < txs[0].id).group_by(
+                Transaction.user_id, Transaction.currency):
+            available[(user_id, currency)] -= held or 0.0
+
+    rejected, approved = [], []
+    reasons: Dict[int, str] = {}
+    for t in txs:
+        if t.amount is None or t.amount <= 0 or t.tx_type not in ("deposit", "withdrawal"):
+            rejected.append(t.id)
+            reasons[t.id] = "invalid"
+        elif t.tx_type == "withdrawal":
+            key = (t.user_id, t.currency)
+            if available[key] < t.amount:
+                rejected.append(t.id)
+                reasons[t.id] = "insufficient_balance"
+            else:
+                available[key] -= t.amount
+        elif 0 < t.amount <= AUTO_APPROVE_DEPOSIT_LIMIT:
+            approved.append(t.id)
+
+    rejected = _move_pending(db, rejected, "rejected")
+    approved = _move_pending(db, approved, "approved")
+    apply_approved(db, approved)
+    bump_for_transactions(db, rejected + approved)
+    _notify(db, rejected + approved)
+    return _audit_records(db, rejected, "rejected", reasons) + _audit_records(db, approved, "approved")
+
+
+def handle_status_changed(db: Session, events: List[OutboxEvent]):
+    _notify(db, [e.aggregate_id for e in events])
+
+
+HANDLERS: Dict[str, Callable[[Session, List[OutboxEvent]], Optional[List[tuple]]]] = {
+    "transaction.created": handle_transaction_created,
+    "transaction.approved": handle_status_changed,
+    "transaction.rejected": handle_status_changed,
+}
+
+
+# ---- worker ----
+def _run_handlers(db: Session, events: List[OutboxEvent]) -> List[tuple]:
+    by_type = defaultdict(list)
+    for e in events:
+        by_type[e.event_type].append(e)
+    records = []
+    for event_type, group in by_type.items():
+        handler = HANDLERS.get(event_type)
+        if handler is None:
+            raise ValueError(f"No handler for outbox event '{event_type}'")
+        records.extend(handler(db, group) or [])
+    db.execute(update(OutboxEvent).where(OutboxEvent.id.in_([e.id for e in events])).values(
+        status="done", processed_at=datetime.utcnow()))
+    return records
+
+
+def _record_failure(db: Session, event_id: int, attempts: int, error: Exception):
+    attempts += 1
+    delay = RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    db.execute(update(OutboxEvent).where(OutboxEvent.id == event_id).values(
+        attempts=attempts,
+        last_error=str(error)[:500],
+        status="failed" if attempts >= MAX_ATTEMPTS else "pending",
+        available_at=datetime.utcnow() + timedelta(seconds=delay),
+    ))
+
+
+def process_batch(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Drain up to batch_size due events. Handler effects and the 'done' marks
+    commit together; if the batch fails, events are retried one by one so a
+    single bad event only delays itself (exponential backoff, then 'failed').
+    """
+    events = db.query(OutboxEvent).filter(
+        OutboxEvent.status == "pending", OutboxEvent.available_at <= datetime.utcnow()
+    ).order_by(OutboxEvent.id).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not events:
+        return 0
+
+    try:
+        records = _run_handlers(db, events)
+        db.commit()
+        audit_log.record_many(records)
+        return len(events)
+    except Exception:
+        db.rollback()
+        logger.exception("outbox batch failed, retrying events individually")
+
+    for event_id in [e.id for e in events]:
+        event = db.query(OutboxEvent).filter(
+            OutboxEvent.id == event_id, OutboxEvent.status == "pending"
+        ).with_for_update(skip_locked=True).first()
+        if event is None:
+            continue
+        attempts = event.attempts
+        try:
+            records = _run_handlers(db, [event])
+            db.commit()
+            audit_log.record_many(records)
+        except Exception as e:
+            db.rollback()
+            _record_failure(db, event_id, attempts, e)
+            db.commit()
+    return len(events)
+
+
+def run_worker(session_factory, stop: threading.Event = None, batch_size: int = BATCH_SIZE,
+               poll_interval: float = POLL_INTERVAL_SECONDS):
+    # keep draining while there is a backlog, sleep only when idle
+    stop = stop or threading.Event()
+    next_purge = time.monotonic()
+    while not stop.is_set():
+        db = session_factory()
+        try:
+            processed = process_batch(db, batch_size)
+            if time.monotonic() >= next_purge:
+                next_purge = time.monotonic() + IDEMPOTENCY_PURGE_SECONDS
+                purged = purge_expired(db)
+                if purged:
+                    logger.info("purged %d expired idempotency keys", purged)
+        except Exception:
+            logger.exception("outbox worker error")
+            processed = 0
+        finally:
+            db.close()
+        if processed < batch_size:
+            stop.wait(poll_interval)
+
+
+def start_worker_thread(session_factory) -> threading.Event:
+    stop = threading.Event()
+    threading.Thread(target=run_worker, args=(session_factory, stop), name="outbox-worker", daemon=True).start()
+    return stop
+
+
+if __name__ == "__main__":
+    # usage: python -m app.services.outbox [--once]
+    from app.db.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    if "--once" in sys.argv[1:]:
+        db = SessionLocal()
+        try:
+            total = 0
+            while True:
+                n = process_batch(db)
+                total += n
+                if n == 0:
+                    break
+            print(f"processed {total} events")
+        finally:
+            db.close()
+    else:
+        run_worker(SessionLocal)
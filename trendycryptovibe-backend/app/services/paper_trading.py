@@ -0,0 +1,359 @@
+import logging
+import os
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+from app.models.paper import PaperAccount, PaperOrder
+from app.core.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("combined", "quant")
+FLUSH_BATCH_SIZE = 1000
+# bars of history each strategy sees; the slowest indicator needs ~35
+HISTORY_BARS = 200
+MIN_HISTORY_BARS = 35
+STEP_INTERVAL_SECONDS = float(os.getenv("PAPER_STEP_SECONDS", "60"))
+
+BUY, HOLD, SELL = 1, 0, -1
+_SIGNAL_CODES = {"buy": BUY, "hold": HOLD, "sell": SELL}
+
+# (symbol, interval, strategy): every account on the same market gets the same signal
+Market = Tuple[str, str, str]
+
+
+class PaperBook:
+    """
+    Every active paper account as parallel NumPy columns. A price update
+    marks all of them to market and applies the strategy fills in one
+    vectorized pass; rows that changed are flagged dirty and written back
+    by flush() in batches, so no ORM object is built per position.
+    """
+
+    FLOAT_COLUMNS = ("cash", "qty", "entry_price", "last_price", "equity", "fee_pct")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # one tick at a time per book: step, take_dirty and flush belong together
+        self.step_lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.version = np.empty(0, dtype=np.int64)
+        self.market = np.empty(0, dtype=np.int32)
+        for name in self.FLOAT_COLUMNS:
+            setattr(self, name, np.empty(0))
+        self.dirty = np.empty(0, dtype=bool)
+        self.markets: List[Market] = []
+        self._market_index: Dict[Market, int] = {}
+        self.max_id = 0
+        self.closed_since: Optional[datetime] = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _market_id(self, market: Market) -> int:
+        index = self._market_index.get(market)
+        if index is None:
+            index = self._market_index[market] = len(self.markets)
+            self.markets.append(market)
+        return index
+
+    def load(self, db: Session) -> int:
+        """
+        Append accounts created since the last load (ids only grow) and drop
+        the ones closed since then, which may have happened in another process.
+        """
+        now = datetime.utcnow()
+        if self.closed_since is not None:
+            closed = [r.id for r in db.query(PaperAccount.id).filter(PaperAccount.closed_at >= self.closed_since)]
+            if closed:
+                self.remove(closed)
+        self.closed_since = now
+
+        rows = db.query(
+            PaperAccount.id, PaperAccount.symbol, PaperAccount.interval, PaperAccount.strategy,
+            PaperAccount.cash, PaperAccount.qty, PaperAccount.entry_price, PaperAccount.last_price,
+            PaperAccount.equity, PaperAccount.fee_pct, PaperAccount.version,
+        ).filter(PaperAccount.id > self.max_id, PaperAccount.active.is_(True)).order_by(PaperAccount.id).all()
+        if not rows:
+            return 0
+
+        with self.lock:
+            self.ids = np.concatenate((self.ids, [r.id for r in rows]))
+            self.version = np.concatenate((self.version, [r.version for r in rows]))
+            self.market = np.concatenate((self.market, np.array(
+                [self._market_id((r.symbol, r.interval, r.strategy)) for r in rows], dtype=np.int32)))
+            for name in self.FLOAT_COLUMNS:
+                values = np.array([getattr(r, name) for r in rows], dtype=np.float64)
+                setattr(self, name, np.concatenate((getattr(self, name), values)))
+            self.dirty = np.concatenate((self.dirty, np.zeros(len(rows), dtype=bool)))
+            self.max_id = rows[-1].id
+        return len(rows)
+
+    def remove(self, account_ids):
+        with self.lock:
+            keep = ~np.isin(self.ids, list(account_ids))
+            for name in ("ids", "version", "market", "dirty", *self.FLOAT_COLUMNS):
+                setattr(self, name, getattr(self, name)[keep])
+
+    @observe("PaperBook.step")
+    def step(self, prices: Dict[str, float], signals: Dict[Market, int]) -> List[dict]:
+        """
+        Fill every account whose market signalled (all-in buys from cash,
+        full exits on sell, fee on notional), then mark everything with a
+        price to market. Returns the fills as paper_orders rows.
+        """
+        with self.lock:
+            if not len(self.ids):
+                return []
+            market_price = np.array([prices.get(symbol, np.nan) for symbol, _, _ in self.markets])
+            market_signal = np.array([signals.get(m, HOLD) for m in self.markets], dtype=np.int8)
+            px = market_price[self.market]
+            signal = market_signal[self.market]
+            priced = ~np.isnan(px)
+
+            buy = priced & (signal == BUY) & (self.qty == 0) & (self.cash > 0)
+            sell = priced & (signal == SELL) & (self.qty > 0)
+
+            spend = self.cash[buy]
+            buy_fee = spend * self.fee_pct[buy]
+            buy_qty = (spend - buy_fee) / px[buy]
+            self.qty[buy] = buy_qty
+            self.cash[buy] = 0.0
+            self.entry_price[buy] = px[buy]
+
+            sell_qty = self.qty[sell]
+            proceeds = sell_qty * px[sell]
+            sell_fee = proceeds * self.fee_pct[sell]
+            self.cash[sell] += proceeds - sell_fee
+            self.qty[sell] = 0.0
+            self.entry_price[sell] = np.nan
+
+            moved = priced & (px != self.last_price)
+            self.last_price[priced] = px[priced]
+            self.equity[priced] = self.cash[priced] + self.qty[priced] * px[priced]
+            self.dirty |= moved | buy | sell
+
+            now = datetime.utcnow()
+            orders = [
+                {"account_id": int(a), "side": "buy", "qty": float(q), "price": float(p), "fee": float(f), "created_at": now}
+                for a, q, p, f in zip(self.ids[buy], buy_qty, px[buy], buy_fee)
+            ]
+            orders += [
+                {"account_id": int(a), "side": "sell", "qty": float(q), "price": float(p), "fee": float(f), "created_at": now}
+                for a, q, p, f in zip(self.ids[sell], sell_qty, px[sell], sell_fee)
+            ]
+            return orders
+
+    def take_dirty(self) -> List[dict]:
+        with self.lock:
+            rows = np.flatnonzero(self.dirty)
+            self.dirty[rows] = False
+            now = datetime.utcnow()
+            columns = {name: getattr(self, name)[rows].tolist() for name in ("cash", "qty", "entry_price", "last_price", "equity")}
+            versions = self.version[rows].tolist()
+            return [
+                {"b_id": int(account_id), "b_version": versions[i], "updated_at": now,
+                 **{name: (None if values[i] != values[i] else values[i]) for name, values in columns.items()}}
+                for i, account_id in enumerate(self.ids[rows].tolist())
+            ]
+
+    def written(self, rows: List[dict]):
+        # the database now holds version + 1 for every flushed row
+        with self.lock:
+            self.version[np.isin(self.ids, [r["b_id"] for r in rows])] += 1
+
+    def reset(self):
+        # forget everything; the next load() rebuilds the book from the database
+        with self.lock:
+            self._clear()
+
+
+book = PaperBook()
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def flush(db: Session, rows: List[dict], orders: List[dict], batch_size: int = FLUSH_BATCH_SIZE) -> bool:
+    """
+    executemany UPDATE by primary key and a bulk INSERT, one round trip per
+    batch, all in one commit. Every UPDATE is conditional on the version the
+    book loaded; if another book (an API worker's /paper/step, a second
+    engine) wrote any of these rows first, nothing is written and False is
+    returned, so its fills are never applied twice.
+    """
+    table = PaperAccount.__table__
+    stmt = update(table).where(
+        table.c.id == bindparam("b_id"), table.c.version == bindparam("b_version")
+    ).values(version=table.c.version + 1)
+    # without a reliable executemany rowcount each row is checked on its own
+    batched = db.get_bind().dialect.supports_sane_multi_rowcount
+    for chunk in _chunks(rows, batch_size if batched else 1):
+        if db.execute(stmt, chunk).rowcount != len(chunk):
+            db.rollback()
+            return False
+    for chunk in _chunks(orders, batch_size):
+        db.execute(insert(PaperOrder), chunk)
+    db.commit()
+    return True
+
+
+def strategy_signal(strategy: str, closes: List[float]) -> int:
+    if len(closes) < MIN_HISTORY_BARS:
+        return HOLD
+    if strategy == "quant":
+        import pandas as pd
+        from app.ai.quant_engine import QuantEngine
+        from app.ai.indicators import add_indicators
+
+        engine = QuantEngine()
+        df = add_indicators(pd.DataFrame({"close": closes}), engine.ma_short, engine.ma_long, engine.rsi_period)
+        return _SIGNAL_CODES[engine.signal_row(df.iloc[-1]).lower()]
+
+    return _SIGNAL_CODES.get(_get_bot().combined_signal(closes)["signal"], HOLD)
+
+
+_bot = None
+
+
+def _get_bot():
+    global _bot
+    if _bot is None:
+        from app.ai.trading_bot import TradingBot
+        _bot = TradingBot(ma_short=5, ma_long=20)
+    return _bot
+
+
+def market_inputs(markets: List[Market], store=None) -> Tuple[Dict[str, float], Dict[Market, int]]:
+    """
+    Latest price per symbol and one signal per market, read from the local
+    candle store (app.ai.resample) without touching the network.
+    """
+    if store is None:
+        from app.ai.resample import candles as store
+
+    prices: Dict[str, float] = {}
+    signals: Dict[Market, int] = {}
+    for symbol, interval, strategy in markets:
+        closes = store.closes(symbol, interval, limit=HISTORY_BARS)
+        if not closes:
+            continue
+        prices[symbol] = closes[-1]
+        try:
+            signals[(symbol, interval, strategy)] = strategy_signal(strategy, closes)
+        except Exception:
+            logger.exception("paper signal failed for %s %s %s", symbol, interval, strategy)
+    return prices, signals
+
+
+def run_step(db: Session, paper_book: PaperBook = book, store=None, refresh: bool = False) -> dict:
+    """
+    One engine tick: pick up new accounts, read prices and signals, fill and
+    mark every account, then write changed rows back in batches.
+    """
+    with paper_book.step_lock:
+        return _step(db, paper_book, store, refresh)
+
+
+def _step(db: Session, paper_book: PaperBook, store, refresh: bool) -> dict:
+    paper_book.load(db)
+    if refresh:
+        if store is None:
+            from app.ai.resample import candles as store
+        for symbol in {symbol for symbol, _, _ in paper_book.markets}:
+            try:
+                store.refresh(symbol)
+            except Exception:
+                logger.exception("candle refresh failed for %s", symbol)
+    prices, signals = market_inputs(paper_book.markets, store)
+    orders = paper_book.step(prices, signals)
+    rows = paper_book.take_dirty()
+    try:
+        written = flush(db, rows, orders)
+    except Exception:
+        db.rollback()
+        # keep the rows dirty so the next tick writes them again
+        with paper_book.lock:
+            paper_book.dirty[np.isin(paper_book.ids, [r["b_id"] for r in rows])] = True
+        raise
+    if not written:
+        # another book moved these accounts; drop this tick and start again from the database
+        logger.warning("paper accounts changed by another writer, reloading the book")
+        paper_book.reset()
+        paper_book.load(db)
+        return {"accounts": len(paper_book), "updated": 0, "orders": 0, "conflict": True}
+    paper_book.written(rows)
+    return {"accounts": len(paper_book), "updated": len(rows), "orders": len(orders)}
+
+
+def run_engine(session_factory, stop: threading.Event = None, interval: float = STEP_INTERVAL_SECONDS,
+               refresh: bool = True):
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        db = session_factory()
+        try:
+            run_step(db, refresh=refresh)
+        except Exception:
+            logger.exception("paper trading step failed")
+        finally:
+            db.close()
+        stop.wait(interval)
+
+
+def start_engine_thread(session_factory) -> threading.Event:
+    stop = threading.Event()
+    threading.Thread(target=run_engine, args=(session_factory, stop), name="paper-trading", daemon=True).start()
+    return stop
+
+
+def create_account(db: Session, user_id: int, symbol: str, strategy: str = "combined", interval: str = "1h",
+                   initial_capital: float = 1000.0, fee_pct: float = 0.001) -> PaperAccount:
+    from app.ai.resample import interval_ms
+
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'")
+    if initial_capital <= 0:
+        raise ValueError("initial_capital must be positive")
+    if not 0 <= fee_pct < 1:
+        raise ValueError("fee_pct must be in [0, 1)")
+    interval_ms(interval)
+
+    account = PaperAccount(
+        user_id=user_id, symbol=symbol.upper(), interval=interval, strategy=strategy, fee_pct=fee_pct,
+        initial_capital=initial_capital, cash=initial_capital, qty=0.0, equity=initial_capital, active=True,
+    )
+    db.add(account)
+    db.commit()
+    db.refresh(account)
+    return account
+
+
+def close_account(db: Session, account: PaperAccount):
+    account.active = False
+    account.closed_at = datetime.utcnow()
+    db.commit()
+    book.remove([account.id])
+
+
+if __name__ == "__main__":
+    # usage: python -m app.services.paper_trading [--once]
+    from app.db.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    if "--once" in sys.argv[1:]:
+        db = SessionLocal()
+        try:
+            print(run_step(db, refresh=True))
+        finally:
+            db.close()
+    else:
+        run_engine(SessionLocal)
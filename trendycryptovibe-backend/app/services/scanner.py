@@ -0,0 +1,296 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from app.core.metrics import observe
+from app.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UNIVERSE = "BTCUSDT,ETHUSDT,BNBUSDT,SOLUSDT,XRPUSDT,ADAUSDT,DOGEUSDT,AVAXUSDT,DOTUSDT,LINKUSDT"
+SCAN_UNIVERSE = [s.strip().upper() for s in os.getenv("SCAN_UNIVERSE", DEFAULT_UNIVERSE).split(",") if s.strip()]
+SCAN_INTERVAL = os.getenv("SCAN_INTERVAL", "1h")
+SCAN_SNAPSHOT = os.getenv("SCAN_SNAPSHOT", "scan_snapshot.json")
+# seconds after the candle close before scanning, so the exchange has finalized the bar
+SCAN_DELAY_SECONDS = float(os.getenv("SCAN_DELAY_SECONDS", "5"))
+FETCH_WORKERS = 8
+HISTORY_BARS = 200
+MIN_HISTORY_BARS = 35
+
+NUMERIC_FIELDS = ("price", "change_pct", "score", "volatility", "rsi", "macd", "macd_signal",
+                  "ma_5", "ma_20", "bb_h", "bb_l", "bar_ts")
+TEXT_FIELDS = ("symbol", "signal", "momentum", "ma", "quant_signal")
+
+
+class ScanTable:
+    """
+    Latest scan results as columns: NumPy arrays for numeric fields and
+    object arrays for text, so a filter is a few vector comparisons and a
+    sort is one argsort, whatever the universe size.
+    """
+
+    def __init__(self, rows: List[dict] = (), interval: str = SCAN_INTERVAL, scanned_at: Optional[str] = None):
+        self.interval = interval
+        self.scanned_at = scanned_at
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.array([r.get(name) for r in rows], dtype=object) for name in TEXT_FIELDS
+        }
+        self.columns.update({
+            name: np.array([np.nan if r.get(name) is None else r[name] for r in rows], dtype=np.float64)
+            for name in NUMERIC_FIELDS
+        })
+        self.size = len(rows)
+
+    def query(self, filters: Dict[str, object] = None, sort: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """
+        filters: {"signal": "buy", "rsi__lt": 40, "change_pct__gt": 0, "symbol__in": [...]}
+        sort: a numeric field, "-" prefix for descending; NaNs sort last.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for key, value in (filters or {}).items():
+                name, _, op = key.partition("__")
+                if name not in self.columns:
+                    raise ValueError(f"Unknown field '{name}'")
+                column = self.columns[name]
+                if op == "":
+                    mask &= column == value
+                elif op == "in":
+                    mask &= np.isin(column, list(value))
+                elif op in ("lt", "le", "gt", "ge") and name in NUMERIC_FIELDS:
+                    mask &= getattr(np, {"lt": "less", "le": "less_equal", "gt": "greater", "ge": "greater_equal"}[op])(column, float(value))
+                else:
+                    raise ValueError(f"Unsupported filter '{key}'")
+
+        rows = np.flatnonzero(mask)
+        if sort:
+            name = sort.lstrip("-")
+            if name not in NUMERIC_FIELDS:
+                raise ValueError(f"Cannot sort by '{name}'")
+            values = self.columns[name][rows]
+            keys = -values if sort.startswith("-") else values
+            rows = rows[np.argsort(np.where(np.isnan(keys), np.inf, keys), kind="stable")]
+        if limit:
+            rows = rows[:limit]
+        return [self._row(i) for i in rows]
+
+    def _row(self, i: int) -> dict:
+        row = {}
+        for name, column in self.columns.items():
+            value = column[i]
+            if isinstance(value, float) and value != value:
+                value = None
+            row[name] = int(value) if name == "bar_ts" and value is not None else value
+        return row
+
+    def rows(self) -> List[dict]:
+        return [self._row(i) for i in range(self.size)]
+
+
+def scan_symbol(symbol: str, closes: List[float], bar_ts: int, bot) -> Optional[dict]:
+    from app.ai.kernels import compute_indicators
+    from app.ai.quant_engine import QuantEngine
+
+    if len(closes) < MIN_HISTORY_BARS:
+        return None
+    combined = bot.combined_signal(closes)
+    engine = QuantEngine()
+    values = compute_indicators(np.asarray(closes, dtype=np.float64), ma_short=engine.ma_short,
+                                ma_long=engine.ma_long, rsi_period=engine.rsi_period)
+    last = {name: float(column[-1]) for name, column in values.items()}
+
+    return {
+        "symbol": symbol,
+        "price": closes[-1],
+        "change_pct": (closes[-1] / closes[-2] - 1) * 100 if closes[-2] else None,
+        "signal": combined["signal"],
+        "score": float(combined["score"]),
+        "momentum": combined["momentum"],
+        "ma": combined["ma"],
+        "volatility": float(combined["volatility"]),
+        "quant_signal": engine.signal_row(last).lower(),
+        "bar_ts": bar_ts,
+        **last,
+    }
+
+
+class Scanner:
+    def __init__(self, universe: List[str] = None, interval: str = SCAN_INTERVAL,
+                 snapshot_path: Optional[str] = SCAN_SNAPSHOT, store=None):
+        self.universe = universe if universe is not None else SCAN_UNIVERSE
+        self.interval = interval
+        self.snapshot_path = snapshot_path
+        self._store = store
+        self.table = ScanTable(interval=interval)
+        # (mtime, inode) of the snapshot file the table was last read from or written to
+        self._snapshot_stamp = None
+        # held for a whole cycle; a cycle that finds it taken is skipped, never queued
+        self._running = threading.Lock()
+        self.skipped = 0
+        self.last_duration: Optional[float] = None
+        self._prefetching = set()
+        self._prefetch_lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            from app.ai.resample import candles
+            self._store = candles
+        return self._store
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.snapshot_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_ino
+
+    def load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        stamp = self._stamp()
+        try:
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            logger.exception("could not read scan snapshot %s", self.snapshot_path)
+            return False
+        self.table = ScanTable(data.get("results", []), data.get("interval", self.interval), data.get("scanned_at"))
+        self._snapshot_stamp = stamp
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """
+        Pick up a snapshot written by another process (the scheduler runs in
+        one worker only); costs a single stat() when nothing changed.
+        """
+        if not self.snapshot_path:
+            return False
+        stamp = self._stamp()
+        if stamp is None or stamp == self._snapshot_stamp:
+            return False
+        return self.load_snapshot()
+
+    def _save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        payload = {"interval": self.table.interval, "scanned_at": self.table.scanned_at, "results": self.table.rows()}
+        tmp = f"{self.snapshot_path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(dumps(payload))
+        # readers never see a half-written snapshot
+        os.replace(tmp, self.snapshot_path)
+        self._snapshot_stamp = self._stamp()
+
+    def _refresh(self, symbol: str):
+        try:
+            self.store.refresh(symbol)
+        except Exception:
+            logger.warning("candle refresh failed for %s", symbol, exc_info=True)
+
+    def prefetch(self, symbols: List[str]):
+        """
+        Fetch candles for universe symbols this process has none of, on a
+        background thread; callers answer from what is stored meanwhile.
+        """
+        with self._prefetch_lock:
+            todo = [s for s in dict.fromkeys(symbols)
+                    if s in self.universe and s not in self._prefetching and self.store.last_ts(s) is None]
+            self._prefetching.update(todo)
+        if todo:
+            threading.Thread(target=self._prefetch, args=(todo,), name="candle-prefetch", daemon=True).start()
+
+    def _prefetch(self, symbols: List[str]):
+        try:
+            with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(symbols))) as pool:
+                list(pool.map(self._refresh, symbols))
+        finally:
+            with self._prefetch_lock:
+                self._prefetching.difference_update(symbols)
+
+    @observe("Scanner.scan")
+    def scan(self, refresh: bool = True) -> Optional[dict]:
+        """
+        One cycle over the whole universe. Returns None (and counts a skip)
+        if the previous cycle is still running.
+        """
+        if not self._running.acquire(blocking=False):
+            self.skipped += 1
+            logger.warning("scan skipped: previous cycle still running")
+            return None
+        try:
+            start = time.perf_counter()
+            if refresh:
+                with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+                    list(pool.map(self._refresh, self.universe))
+
+            from app.ai.trading_bot import TradingBot
+            bot = TradingBot(ma_short=5, ma_long=20)
+            rows = []
+            for symbol in self.universe:
+                bars = self.store.bars(symbol, self.interval, limit=HISTORY_BARS)
+                if not len(bars["ts"]):
+                    continue
+                try:
+                    row = scan_symbol(symbol, bars["close"].tolist(), int(bars["ts"][-1]), bot)
+                except Exception:
+                    logger.exception("scan failed for %s", symbol)
+                    continue
+                if row is not None:
+                    rows.append(row)
+
+            # swap in the new table whole; readers keep the old one until then
+            self.table = ScanTable(rows, self.interval, datetime.utcnow().isoformat())
+            self._save_snapshot()
+            self.last_duration = time.perf_counter() - start
+            return {"symbols": len(self.universe), "scanned": len(rows), "seconds": round(self.last_duration, 3)}
+        finally:
+            self._running.release()
+
+    @property
+    def running(self) -> bool:
+        return self._running.locked()
+
+
+scanner = Scanner()
+
+
+def seconds_until_next_close(interval: str, now: float = None, delay: float = SCAN_DELAY_SECONDS) -> float:
+    from app.ai.resample import interval_ms
+
+    step, offset = interval_ms(interval)
+    now_ms = (time.time() if now is None else now) * 1000
+    next_close = ((now_ms - offset) // step + 1) * step + offset
+    return (next_close - now_ms) / 1000 + delay
+
+
+def run_scheduler(stop: threading.Event = None, target: Scanner = scanner):
+    # waits are computed after each cycle, so a slow cycle skips closes instead of stacking
+    stop = stop or threading.Event()
+    while not stop.wait(seconds_until_next_close(target.interval)):
+        try:
+            target.scan()
+        except Exception:
+            logger.exception("scan cycle failed")
+
+
+def start_scanner_thread(target: Scanner = scanner) -> threading.Event:
+    stop = threading.Event()
+    threading.Thread(target=run_scheduler, args=(stop, target), name="market-scanner", daemon=True).start()
+    return stop
+
+
+if __name__ == "__main__":
+    # usage: python -m app.services.scanner [--once]
+    logging.basicConfig(level=logging.INFO)
+    if "--once" in sys.argv[1:]:
+        print(scanner.scan())
+    else:
+        scanner.load_snapshot()
+        run_scheduler()
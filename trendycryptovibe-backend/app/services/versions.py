@@ -0,0 +1,52 @@
+from typing import Iterable
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.versions import UserVersion
+from app.models.transactions import Transaction
+
+SCOPES = ("wallets", "transactions", "balances")
+CHUNK_SIZE = 500
+
+
+def get_version(db: Session, user_id: int, scope: str) -> int:
+    row = db.query(getattr(UserVersion, scope)).filter(UserVersion.user_id == user_id).first()
+    return row[0] if row else 0
+
+
+def bump(db: Session, scope: str, user_ids: Iterable[int]):
+    """
+    Increment the scope counter for each user inside the caller's transaction.
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown version scope '{scope}'")
+    user_ids = sorted({u for u in user_ids if u is not None})
+    if not user_ids:
+        return
+    column = getattr(UserVersion, scope)
+    rows = [{"user_id": u, **dict.fromkeys(SCOPES, 0), scope: 1} for u in user_ids]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(UserVersion).on_conflict_do_update(
+            index_elements=["user_id"], set_={scope: column + 1}
+        )
+        db.execute(stmt, rows)
+        return
+
+    for row in rows:
+        updated = db.query(UserVersion).filter(UserVersion.user_id == row["user_id"]).update(
+            {scope: column + 1}, synchronize_session=False)
+        if not updated:
+            db.execute(insert(UserVersion), [row])
+
+
+def bump_for_transactions(db: Session, tx_ids: Iterable[int]):
+    # owners of the given transactions see a new transactions version
+    tx_ids = list(tx_ids)
+    user_ids = set()
+    for i in range(0, len(tx_ids), CHUNK_SIZE):
+        chunk = tx_ids[i:i + CHUNK_SIZE]
+        user_ids.update(u for (u,) in db.query(Transaction.user_id).filter(Transaction.id.in_(chunk)).distinct())
+    bump(db, "transactions", user_ids)
@@ -0,0 +1,214 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from .synthetic import synthetic_ohlcv
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+# timings this close to the baseline are noise whatever the ratio
+NOISE_SECONDS = 0.002
+# keep repeating a case until this much time is spent (min of the runs is reported)
+MIN_TOTAL_SECONDS = 0.5
+MAX_REPEATS = 20
+
+
+class Case:
+    """
+    prepare(data) does the untimed setup (lists, frames) and returns the
+    zero-argument call that is timed. max_size keeps the superlinear
+    engines out of sizes they would take minutes on; --no-limits lifts it.
+    """
+
+    def __init__(self, name: str, prepare: Callable[[Dict[str, np.ndarray]], Callable], max_size: Optional[int] = None):
+        self.name = name
+        self.prepare = prepare
+        self.max_size = max_size
+
+
+def _backtest(data):
+    from app.ai.trading_bot import TradingBot
+    bot, prices = TradingBot(ma_short=5, ma_long=20), data["close"].tolist()
+    return lambda: bot.backtest(prices, initial_capital=1000.0, fee_pct=0.001)
+
+
+def _combined_signal(data):
+    from app.ai.trading_bot import TradingBot
+    bot, prices = TradingBot(ma_short=5, ma_long=20), data["close"].tolist()
+    return lambda: bot.combined_signal(prices)
+
+
+def _quant_backtest(data):
+    import pandas as pd
+    from app.ai.quant_engine import QuantEngine
+    engine, df = QuantEngine(), pd.DataFrame({"close": data["close"]})
+    return lambda: engine.backtest_df(df, initial_capital=1000.0)
+
+
+def _add_indicators(data):
+    import pandas as pd
+    from app.ai.indicators import add_indicators
+    df = pd.DataFrame({name: data[name] for name in ("open", "high", "low", "close", "volume")})
+    return lambda: add_indicators(df)
+
+
+def _compute_metrics(data):
+    from app.ai.quant_engine import compute_metrics
+    equity = (data["close"] / data["close"][0] * 1000.0).tolist()
+    pnls = np.diff(equity[::100]).tolist() or [0.0]
+    return lambda: compute_metrics(equity, 1000.0, pnls)
+
+
+CASES = [
+    # O(n^2): every step re-slices the history
+    Case("TradingBot.backtest", _backtest, max_size=20_000),
+    Case("TradingBot.combined_signal", _combined_signal),
+    # row-by-row iterrows loop, ~40 s at 1M
+    Case("QuantEngine.backtest_df", _quant_backtest, max_size=100_000),
+    Case("add_indicators", _add_indicators),
+    Case("compute_metrics", _compute_metrics),
+]
+
+
+def measure(fn: Callable, memory: bool = True) -> dict:
+    gc.collect()
+    runs: List[float] = []
+    total = 0.0
+    while len(runs) < MAX_REPEATS and (not runs or total < MIN_TOTAL_SECONDS):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+        total += runs[-1]
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {"seconds": min(runs), "median_seconds": statistics.median(runs), "repeats": len(runs),
+            "peak_mb": None if peak is None else peak / 2**20}
+
+
+def run(sizes=DEFAULT_SIZES, names: Optional[List[str]] = None, seed: int = 42, memory: bool = True,
+        limits: bool = True, log=print) -> Dict[str, dict]:
+    results = {}
+    for size in sizes:
+        data = synthetic_ohlcv(size, seed)
+        for case in CASES:
+            if names and case.name not in names:
+                continue
+            key = f"{case.name}@{size}"
+            if limits and case.max_size and size > case.max_size:
+                log(f"{key:<40} skipped (max_size {case.max_size})")
+                continue
+            result = measure(case.prepare(data), memory)
+            result["candles_per_second"] = size / result["seconds"] if result["seconds"] else None
+            results[key] = result
+            log(format_row(key, result))
+    return results
+
+
+def format_row(key: str, result: dict) -> str:
+    peak = "-" if result["peak_mb"] is None else f"{result['peak_mb']:.1f} MB"
+    return (f"{key:<40} {result['seconds'] * 1000:>11.2f} ms  {result['candles_per_second']:>14,.0f} candles/s"
+            f"  peak {peak:>10}  x{result['repeats']}")
+
+
+def compare(results: Dict[str, dict], baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+            memory_threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Regressions against a baseline file. Per-case thresholds in the
+    baseline's "thresholds" (keyed by case name or name@size) override
+    the command-line ones.
+    """
+    overrides = baseline.get("thresholds", {})
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        limit = overrides.get(key, overrides.get(key.split("@")[0], threshold))
+        slower = result["seconds"] / base["seconds"] - 1 if base["seconds"] else 0.0
+        if slower > limit and result["seconds"] - base["seconds"] > NOISE_SECONDS:
+            regressions.append(f"{key}: {result['seconds'] * 1000:.2f} ms vs {base['seconds'] * 1000:.2f} ms "
+                               f"(+{slower:.0%}, limit {limit:.0%})")
+        if result.get("peak_mb") is not None and base.get("peak_mb"):
+            grown = result["peak_mb"] / base["peak_mb"] - 1
+            if grown > memory_threshold:
+                regressions.append(f"{key}: peak {result['peak_mb']:.1f} MB vs {base['peak_mb']:.1f} MB "
+                                   f"(+{grown:.0%}, limit {memory_threshold:.0%})")
+    return regressions
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count(),
+            "recorded_at": datetime.utcnow().isoformat()}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analytics hot paths on synthetic candles.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated candle counts")
+    parser.add_argument("--only", help="comma-separated case names")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--no-limits", action="store_true", help="run every case at every size")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    names = args.only.split(",") if args.only else None
+    results = run(sizes, names, args.seed, not args.no_memory, not args.no_limits)
+    report = {"environment": environment(), "seed": args.seed, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.save_baseline:
+        # merge, so a partial run only replaces the cases it measured
+        report["results"] = {**baseline.get("results", {}), **results}
+        report["thresholds"] = baseline.get("thresholds", {})
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("no baseline to compare against")
+        return 0
+    regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+    recorded = baseline.get("environment", {})
+    print(f"\ncompared with baseline from {recorded.get('recorded_at', '?')} "
+          f"(python {recorded.get('python', '?')}, numpy {recorded.get('numpy', '?')})")
+    for line in regressions:
+        print("REGRESSION", line)
+    if not regressions:
+        print("no regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    # usage: python -m benchmarks.analytics [--sizes 1000,100000] [--only add_indicators] [--save-baseline]
+    sys.exit(main())
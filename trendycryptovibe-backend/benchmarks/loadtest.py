@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+DEFAULT_MIX = "login=1,wallets=4,transactions=4,deposit=2,signal=2,backtest=1"
+PASSWORD = "loadtest-password"
+CURRENCIES = ("USDT", "BTC", "ETH")
+
+
+class Endpoint:
+    def __init__(self, name: str, method: str, path: str, auth: bool = True):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.auth = auth
+
+
+ENDPOINTS = {
+    "login": Endpoint("login", "POST", "/users/login", auth=False),
+    "wallets": Endpoint("wallets", "GET", "/wallets/"),
+    "transactions": Endpoint("transactions", "GET", "/transactions/my"),
+    "deposit": Endpoint("deposit", "POST", "/transactions/deposit"),
+    "signal": Endpoint("signal", "POST", "/bot/signal"),
+    "backtest": Endpoint("backtest", "POST", "/bot/backtest"),
+}
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def configure(database_url: str, sqlite_pragmas: str, rate_limits: bool, workdir: str):
+    # read by app.db.database / app.core.ratelimit at import time, and inherited by uvicorn workers
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["SQLITE_PRAGMAS"] = sqlite_pragmas
+    os.environ["RATE_LIMIT_ENABLED"] = "1" if rate_limits else "0"
+    # everything the app writes to disk stays in the run's directory, not the caller's cwd
+    for name, sub in (("AUDIT_DIR", "audit"), ("PROFILE_DIR", "profiles"), ("MODEL_DIR", "models"),
+                      ("SCAN_SNAPSHOT", "scan_snapshot.json")):
+        os.environ[name] = os.path.join(workdir, sub)
+
+
+def seed(users: int, transactions_per_user: int, seed_value: int) -> List[dict]:
+    """
+    Create the schema, N users (one bcrypt hash shared by all, so seeding
+    stays fast), their wallets and a history of transactions, a third of
+    them approved so balances are populated. Returns the users with
+    pre-issued tokens.
+    """
+    from sqlalchemy import insert
+    from app.db.database import SessionLocal, init_db
+    from app.auth.hash import hash_password
+    from app.auth.jwt_handler import create_access_token
+    from app.models.user import User
+    from app.models.transactions import Transaction
+    from app.services.accounts import seed_roles, bulk_import_users
+    from app.services.balances import apply_approved
+
+    init_db()
+    rng = random.Random(seed_value)
+    db = SessionLocal()
+    try:
+        seed_roles(db, ["user", "admin", "support"])
+        password_hash = hash_password(PASSWORD)
+        bulk_import_users(db, ({"email": f"load{i}@example.com", "username": f"load{i}", "password_hash": password_hash}
+                               for i in range(users)))
+        ids = [user_id for (user_id,) in db.query(User.id).filter(User.email.like("load%@example.com")).order_by(User.id)]
+
+        rows = []
+        for user_id in ids:
+            for _ in range(transactions_per_user):
+                rows.append({"user_id": user_id, "tx_type": "deposit", "currency": rng.choice(CURRENCIES),
+                             "amount": round(rng.uniform(10, 1000), 2),
+                             "status": rng.choice(("approved", "pending", "pending"))})
+        if rows:
+            db.execute(insert(Transaction), rows)
+            db.commit()
+            approved = [tx_id for (tx_id,) in db.query(Transaction.id).filter(Transaction.status == "approved")]
+            apply_approved(db, approved)
+            db.commit()
+        return [{"id": user_id, "email": f"load{i}@example.com", "token": create_access_token({"user_id": user_id})}
+                for i, user_id in enumerate(ids)]
+    finally:
+        db.close()
+
+
+def build_request(name: str, user: dict, rng: random.Random, prices: List[float]) -> dict:
+    endpoint = ENDPOINTS[name]
+    request = {"method": endpoint.method, "url": endpoint.path}
+    if endpoint.auth:
+        request["headers"] = {"Authorization": f"Bearer {user['token']}"}
+    if name == "login":
+        request["json"] = {"email": user["email"], "password": PASSWORD}
+    elif name == "deposit":
+        request["params"] = {"amount": round(rng.uniform(10, 500), 2), "currency": rng.choice(CURRENCIES)}
+    elif name == "signal":
+        start = rng.randrange(len(prices) - 200)
+        request["json"] = {"prices": prices[start:start + 200]}
+    elif name == "backtest":
+        start = rng.randrange(len(prices) - 300)
+        request["json"] = {"prices": prices[start:start + 300], "initial_capital": 1000, "fee_pct": 0.001}
+    return request
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, status: int, seconds: float):
+        self.latencies[name].append(seconds)
+        self.statuses[name][status] += 1
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def report(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    every = []
+    for name, values in sorted(recorder.latencies.items()):
+        every.extend(values)
+        statuses = dict(sorted(recorder.statuses[name].items()))
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": sum(count for status, count in statuses.items() if status >= 400 or status == 0),
+            "statuses": statuses,
+            "rps": len(values) / elapsed,
+            "mean_ms": statistics.fmean(values) * 1000,
+            "p50_ms": _percentile(values, 50) * 1000,
+            "p95_ms": _percentile(values, 95) * 1000,
+            "p99_ms": _percentile(values, 99) * 1000,
+        }
+    total = {"requests": len(every), "seconds": elapsed, "rps": len(every) / elapsed if elapsed else 0.0}
+    if every:
+        total.update({"p50_ms": _percentile(every, 50) * 1000, "p95_ms": _percentile(every, 95) * 1000,
+                      "p99_ms": _percentile(every, 99) * 1000})
+    return {"endpoints": endpoints, "total": total}
+
+
+async def drive(client, users: List[dict], mix, concurrency: int, requests: int, duration: float,
+                warmup: int, seed_value: int) -> dict:
+    from .synthetic import synthetic_closes
+
+    prices = synthetic_closes(5000, seed_value).round(2).tolist()
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    recorder = Recorder()
+    issued = 0
+    deadline = None
+
+    async def worker(index: int, budget: int, record: bool):
+        nonlocal issued
+        # one RNG per worker: the same seed and concurrency replay the same request sequence
+        rng = random.Random(f"{seed_value}:{index}:{record}")
+        while issued < budget and (deadline is None or time.perf_counter() < deadline):
+            issued += 1
+            name = rng.choices(names, weights)[0]
+            request = build_request(name, rng.choice(users), rng, prices)
+            start = time.perf_counter()
+            try:
+                status = (await client.request(**request)).status_code
+            except Exception:
+                status = 0
+            if record:
+                recorder.record(name, status, time.perf_counter() - start)
+
+    # warm-up requests (lazy analytics imports, connection pools) are not recorded
+    if warmup:
+        await asyncio.gather(*(worker(i, warmup, False) for i in range(concurrency)))
+
+    issued = 0
+    start = time.perf_counter()
+    if duration:
+        deadline = start + duration
+    budget = requests or sys.maxsize
+    await asyncio.gather(*(worker(i, budget, True) for i in range(concurrency)))
+    return report(recorder, time.perf_counter() - start)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=root, env={**os.environ, "AUTO_CREATE_SCHEMA": "0"},
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start within 60s")
+
+
+async def run(args, users: List[dict]) -> dict:
+    import httpx
+
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.workers:
+        port = _free_port()
+        server = start_server(args.workers, port)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                return await drive(client, users, mix, args.concurrency, args.requests, args.duration,
+                                   args.warmup, args.seed)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    # in-process: the app runs on this event loop, its sync handlers on the AnyIO thread pool
+    import anyio.to_thread
+    import main
+
+    if args.threads:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = args.threads
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits, timeout=60) as client:
+        return await drive(client, users, mix, args.concurrency, args.requests, args.duration, args.warmup, args.seed)
+
+
+def print_report(result: dict, config: dict):
+    print(f"\n{config}")
+    print(f"{'endpoint':<14}{'requests':>10}{'errors':>8}{'rps':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in result["endpoints"].items():
+        print(f"{name:<14}{row['requests']:>10}{row['errors']:>8}{row['rps']:>10.1f}{row['mean_ms']:>10.1f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    total = result["total"]
+    print(f"{'total':<14}{total['requests']:>10}{'':>8}{total['rps']:>10.1f}{'':>10}"
+          f"{total.get('p50_ms', 0):>10.1f}{total.get('p95_ms', 0):>10.1f}{total.get('p99_ms', 0):>10.1f}"
+          f"   in {total['seconds']:.1f}s")
+    for name, row in result["endpoints"].items():
+        unexpected = {status: count for status, count in row["statuses"].items() if status >= 400 or status == 0}
+        if unexpected:
+            print(f"  {name}: error statuses {unexpected}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline load test of the API against a throwaway seeded database.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--transactions-per-user", type=int, default=20)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint=weight list, default {DEFAULT_MIX}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000, help="total requests (0 = run for --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="seconds, when --requests is 0")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--workers", type=int, default=0, help="0 = in-process ASGI, N = uvicorn with N workers")
+    parser.add_argument("--threads", type=int, default=0, help="in-process sync handler threads (AnyIO default 40)")
+    parser.add_argument("--database-url", help="default: a temporary SQLite file, removed afterwards")
+    parser.add_argument("--sqlite-pragmas", default="", help='e.g. "journal_mode=WAL,synchronous=NORMAL"')
+    parser.add_argument("--rate-limits", action="store_true", help="keep the AI endpoint rate limits on")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+    if not args.requests and not args.duration:
+        parser.error("set --requests or --duration")
+
+    tmp = tempfile.mkdtemp(prefix="loadtest-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'loadtest.db')}"
+    configure(database_url, args.sqlite_pragmas, args.rate_limits, tmp)
+    try:
+        started = time.perf_counter()
+        users = seed(args.users, args.transactions_per_user, args.seed)
+        print(f"seeded {len(users)} users, {len(users) * args.transactions_per_user} transactions "
+              f"in {time.perf_counter() - started:.1f}s")
+        result = asyncio.run(run(args, users))
+    finally:
+        # in-process runs: stop the audit writer before its directory goes away
+        audit = sys.modules.get("app.core.audit")
+        if audit is not None:
+            audit.audit_log.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    config = {key: getattr(args, key) for key in ("users", "concurrency", "requests", "duration", "workers",
+                                                  "threads", "sqlite_pragmas", "rate_limits", "seed", "mix")}
+    config["database"] = database_url if args.database_url else "temporary sqlite"
+    print_report(result, config)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": config, **result}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    # usage: python -m benchmarks.loadtest [--users 500] [--concurrency 32] [--workers 4] [--sqlite-pragmas journal_mode=WAL]
+    sys.exit(main())
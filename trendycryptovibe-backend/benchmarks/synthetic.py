@@ -0,0 +1,52 @@
+from typing import Dict
+import numpy as np
+
+# (annual drift, annual volatility) per regime: calm, bull, bear, turbulent
+REGIMES = np.array([
+    (0.00, 0.35),
+    (0.80, 0.55),
+    (-0.70, 0.70),
+    (0.00, 1.40),
+])
+MINUTES_PER_YEAR = 365 * 24 * 60
+INTERVAL_MS = 60_000
+# minute aligned, so the series resamples cleanly
+START_TS = 1_600_000_020_000
+
+
+def synthetic_ohlcv(n: int, seed: int = 42, start_price: float = 30000.0, start_ts: int = START_TS,
+                    switch_prob: float = 0.0005, gap_prob: float = 0.0002, gap_size: float = 0.02) -> Dict[str, np.ndarray]:
+    """
+    Minute candles from a geometric Brownian motion whose drift and
+    volatility switch between REGIMES at random, plus gaps: the open jumps
+    away from the previous close and the timestamp skips up to an hour, as
+    after an exchange outage. Same seed, same series.
+    """
+    rng = np.random.default_rng(seed)
+    segment = np.cumsum(rng.random(n) < switch_prob)
+    regime = rng.integers(0, len(REGIMES), segment[-1] + 1 if n else 1)[segment]
+    dt = 1.0 / MINUTES_PER_YEAR
+    drift, vol = REGIMES[regime, 0] * dt, REGIMES[regime, 1] * np.sqrt(dt)
+
+    gap = rng.random(n) < gap_prob
+    gap[:1] = False
+    jump = np.where(gap, rng.normal(0.0, gap_size, n), 0.0)
+    log_return = drift - 0.5 * vol * vol + vol * rng.standard_normal(n)
+
+    close = start_price * np.exp(np.cumsum(log_return + jump))
+    open_ = np.empty(n)
+    open_[:1] = start_price
+    open_[1:] = close[:-1] * np.exp(jump[1:])
+    wick = np.abs(rng.standard_normal((2, n))) * vol * 0.5
+    high = np.maximum(open_, close) * np.exp(wick[0])
+    low = np.minimum(open_, close) * np.exp(-wick[1])
+    volume = rng.lognormal(3.0, 0.5, n) * (vol / vol.mean() if n else 1.0)
+
+    steps = np.where(gap, rng.integers(2, 61, n), 1)
+    steps[:1] = 0
+    ts = start_ts + np.cumsum(steps) * INTERVAL_MS
+    return {"ts": ts, "open": open_, "high": high, "low": low, "close": close, "volume": volume}
+
+
+def synthetic_closes(n: int, seed: int = 42, **kwargs) -> np.ndarray:
+    return synthetic_ohlcv(n, seed, **kwargs)["close"]
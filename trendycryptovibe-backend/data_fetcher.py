@@ -1,6 +1,8 @@
 import ccxt
 import pandas as pd
+from app.core.metrics import observe
 
+@observe("fetch_ohlcv")
 def fetch_ohlcv(symbol="BTC/USDT", timeframe="5m", limit=200):
     exchange = ccxt.binance({"enableRateLimit": True})
     data = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
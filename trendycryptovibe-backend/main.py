@@ -1,35 +1,80 @@
-from fastapi import FastAPI
-from app.db.database import engine, Base, SessionLocal
-from app.models.role import Role
-from app.routes.user import router as user_router
-from app.routes.wallet import router as wallet_router
-from app.routes.roles import router as roles_router
-from app.routes.transactions import router as transactions_router
-from app.routes.predict import router as predict_router
-from app.routes.trading_bot import router as trading_bot_router
+import importlib
+import os
+from app.core.startup import timed, log_report
 
-Base.metadata.create_all(bind=engine)
+with timed("import fastapi + db"):
+    from fastapi import FastAPI
+    from app.db.database import SessionLocal, init_db
 
-app = FastAPI()
+# Routers keep heavy analytics imports (pandas, numpy, ta, ccxt) inside their
+# handlers, so auth and wallet traffic never pays for them.
+ROUTERS = [
+    "app.routes.user",
+    "app.routes.wallet",
+    "app.routes.roles",
+    "app.routes.transactions",
+    "app.routes.predict",
+    "app.routes.trading_bot",
+    "app.routes.paper",
+    "app.routes.metrics",
+    "app.routes.profiles",
+    "app.routes.audit",
+]
+
+with timed("import serialization"):
+    from app.core.serialization import FastJSONResponse
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+with timed("import middleware"):
+    from app.core.ratelimit import RateLimitMiddleware, rate_limiter
+    from app.core.metrics import MetricsMiddleware
+    from app.core.profiling import ProfilingMiddleware
+
+# per-caller token buckets in front of the CPU-heavy AI endpoints
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+# opt-in sampling profiler for admin-flagged or randomly sampled requests
+app.add_middleware(ProfilingMiddleware)
+# added last so it is outermost and also times rate-limited requests
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 def home():
     return {"status": "Backend running successfully!"}
-app.include_router(user_router)
-app.include_router(wallet_router)
-app.include_router(roles_router)
-app.include_router(transactions_router)
-app.include_router(predict_router)
-app.include_router(trading_bot_router)
+
+for module in ROUTERS:
+    with timed(f"import {module}"):
+        app.include_router(importlib.import_module(module).router)
 
 @app.on_event("startup")
-def create_default_roles():
-    db = SessionLocal()
-    default_roles = ["user", "admin", "support"]
-
-    for role_name in default_roles:
-        existing_role = db.query(Role).filter(Role.name == role_name).first()
-        if not existing_role:
-            db.add(Role(name=role_name))
-    db.commit()
-    db.close()
\ No newline at end of file
+def init_app():
+    from app.services.accounts import seed_roles
+
+    with timed("create schema"):
+        init_db()
+
+    with timed("seed roles"):
+        db = SessionLocal()
+        try:
+            seed_roles(db, ["user", "admin", "support"])
+        finally:
+            db.close()
+
+    # single-node deployments can drain the outbox in-process;
+    # otherwise run `python -m app.services.outbox` as its own worker
+    if os.getenv("OUTBOX_WORKER") == "1":
+        from app.services.outbox import start_worker_thread
+        start_worker_thread(SessionLocal)
+
+    # paper accounts are marked to market by one engine per deployment
+    if os.getenv("PAPER_TRADING_WORKER") == "1":
+        from app.services.paper_trading import start_engine_thread
+        start_engine_thread(SessionLocal)
+
+    # market scanner runs on candle closes; /bot/scan serves its last snapshot
+    if os.getenv("SCANNER_WORKER") == "1":
+        from app.services.scanner import scanner, start_scanner_thread
+        scanner.load_snapshot()
+        start_scanner_thread()
+
+    log_report()
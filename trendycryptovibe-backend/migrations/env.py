@@ -9,7 +9,7 @@ from alembic import context
 
 from app.db.database import Base
 
-from app.models import user, profile, role, user_roles, wallets, transactions
+from app.models import user, profile, role, user_role, wallets, transactions, balances, outbox, versions, paper, idempotency
 target_metadata = Base.metadata
 
 
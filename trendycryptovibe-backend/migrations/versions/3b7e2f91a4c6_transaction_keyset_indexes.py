@@ -0,0 +1,32 @@
+"""transaction keyset indexes
+
+Revision ID: 3b7e2f91a4c6
+Revises: 149466171f8e
+Create Date: 2026-10-19 10:12:04.381920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e2f91a4c6'
+down_revision: Union[str, None] = '149466171f8e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # keyset pagination needs a timestamp on every row
+    op.execute("UPDATE transactions SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+    op.create_index('ix_transactions_user_id_timestamp', 'transactions', ['user_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_transactions_status_timestamp', 'transactions', ['status', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_transactions_timestamp', 'transactions', ['timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_timestamp', table_name='transactions')
+    op.drop_index('ix_transactions_status_timestamp', table_name='transactions')
+    op.drop_index('ix_transactions_user_id_timestamp', table_name='transactions')
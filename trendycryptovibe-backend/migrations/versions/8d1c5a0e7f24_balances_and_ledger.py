@@ -0,0 +1,70 @@
+"""balances and ledger
+
+Revision ID: 8d1c5a0e7f24
+Revises: 3b7e2f91a4c6
+Create Date: 2026-10-19 13:47:52.605113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d1c5a0e7f24'
+down_revision: Union[str, None] = '3b7e2f91a4c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('currency', sa.String(), nullable=False, server_default='USDT'))
+    op.create_table('balances',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'currency')
+    )
+    op.create_table('ledger_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('transaction_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('account', sa.String(), nullable=False),
+    sa.Column('currency', sa.String(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('transaction_id', 'account', name='uq_ledger_entries_transaction_account')
+    )
+    op.create_index(op.f('ix_ledger_entries_user_id'), 'ledger_entries', ['user_id'], unique=False)
+
+    # backfill journal and balances from already approved transactions
+    for account, sign in (('user', 1), ('external', -1)):
+        op.execute(f"""
+            INSERT INTO ledger_entries (transaction_id, user_id, account, currency, amount, created_at)
+            SELECT id, user_id, '{account}', currency,
+                   {sign} * CASE tx_type WHEN 'deposit' THEN amount ELSE -amount END,
+                   CURRENT_TIMESTAMP
+            FROM transactions
+            WHERE status = 'approved' AND user_id IS NOT NULL AND tx_type IN ('deposit', 'withdrawal')
+        """)
+    op.execute("""
+        INSERT INTO balances (user_id, currency, amount, updated_at)
+        SELECT user_id, currency, SUM(amount), CURRENT_TIMESTAMP
+        FROM ledger_entries
+        WHERE account = 'user'
+        GROUP BY user_id, currency
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ledger_entries_user_id'), table_name='ledger_entries')
+    op.drop_table('ledger_entries')
+    op.drop_table('balances')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('currency')
@@ -0,0 +1,26 @@
+"""balances version
+
+Revision ID: 9a3f6c1e2d47
+Revises: 7c4d2e9b0a15
+Create Date: 2026-10-19 18:31:12.604158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3f6c1e2d47'
+down_revision: Union[str, None] = '7c4d2e9b0a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user_versions', sa.Column('balances', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('user_versions', 'balances')
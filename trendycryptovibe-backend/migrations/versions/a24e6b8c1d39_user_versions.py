@@ -0,0 +1,32 @@
+"""user versions
+
+Revision ID: a24e6b8c1d39
+Revises: 5f0a9c3d2b18
+Create Date: 2026-10-19 16:40:33.018542
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a24e6b8c1d39'
+down_revision: Union[str, None] = '5f0a9c3d2b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_versions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('wallets', sa.Integer(), nullable=False),
+    sa.Column('transactions', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_versions')
@@ -0,0 +1,26 @@
+"""paper account version
+
+Revision ID: b5e8d3a7c610
+Revises: 9a3f6c1e2d47
+Create Date: 2026-10-19 18:58:27.913402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e8d3a7c610'
+down_revision: Union[str, None] = '9a3f6c1e2d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('paper_accounts', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('paper_accounts', 'version')
@@ -0,0 +1,26 @@
+"""idempotency keys created_at index
+
+Revision ID: d7a2f4c9e318
+Revises: b5e8d3a7c610
+Create Date: 2026-10-19 19:42:16.508133
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a2f4c9e318'
+down_revision: Union[str, None] = 'b5e8d3a7c610'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_idempotency_keys_created_at'), 'idempotency_keys', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_idempotency_keys_created_at'), table_name='idempotency_keys')
@@ -0,0 +1,61 @@
+"""paper trading
+
+Revision ID: e61f0b7a9c52
+Revises: a24e6b8c1d39
+Create Date: 2026-10-19 17:12:08.441907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e61f0b7a9c52'
+down_revision: Union[str, None] = 'a24e6b8c1d39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('paper_accounts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('symbol', sa.String(), nullable=False),
+    sa.Column('interval', sa.String(), nullable=False),
+    sa.Column('strategy', sa.String(), nullable=False),
+    sa.Column('fee_pct', sa.Float(), nullable=False),
+    sa.Column('initial_capital', sa.Float(), nullable=False),
+    sa.Column('cash', sa.Float(), nullable=False),
+    sa.Column('qty', sa.Float(), nullable=False),
+    sa.Column('entry_price', sa.Float(), nullable=True),
+    sa.Column('last_price', sa.Float(), nullable=True),
+    sa.Column('equity', sa.Float(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('closed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_paper_accounts_user_id'), 'paper_accounts', ['user_id'], unique=False)
+    op.create_table('paper_orders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('side', sa.String(), nullable=False),
+    sa.Column('qty', sa.Float(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('fee', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['account_id'], ['paper_accounts.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_paper_orders_account_id'), 'paper_orders', ['account_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_paper_orders_account_id'), table_name='paper_orders')
+    op.drop_table('paper_orders')
+    op.drop_index(op.f('ix_paper_accounts_user_id'), table_name='paper_accounts')
+    op.drop_table('paper_accounts')